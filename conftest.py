@@ -0,0 +1,10 @@
+import pytest
+
+
+@pytest.fixture(autouse=True, scope='session')
+def temporary_cache(django_test_environment):
+    """Тесты не трогают общий кэш сервера (см. core.cache)."""
+    from core.cache import temporary_cache
+
+    with temporary_cache():
+        yield
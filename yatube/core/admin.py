@@ -0,0 +1,23 @@
+from django.contrib import admin
+
+from .models import Job, OutgoingEmail
+
+
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'from_email', 'recipients', 'created',
+                    'attempts', 'next_attempt', 'sent',)
+    list_filter = ('sent', 'attempts',)
+    readonly_fields = ('message',)
+    empty_value_display = '-пусто-'
+
+
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'queue', 'name', 'status', 'attempts', 'run_at',
+                    'finished',)
+    list_filter = ('queue', 'status',)
+    search_fields = ('name',)
+    empty_value_display = '-пусто-'
+
+
+admin.site.register(OutgoingEmail, OutgoingEmailAdmin)
+admin.site.register(Job, JobAdmin)
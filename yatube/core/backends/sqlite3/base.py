@@ -0,0 +1,77 @@
+import re
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+
+# Настройки по умолчанию для нагруженного сайта: WAL позволяет читать во
+# время записи, synchronous=NORMAL в режиме WAL не теряет целостность при
+# падении процесса, busy_timeout ждёт блокировку вместо мгновенной ошибки.
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+# Значения самой SQLite без настройки: с ними сравнивает loadtest.
+STOCK_PRAGMAS = {
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+    'mmap_size': 0,
+    'cache_size': -2000,
+    'busy_timeout': None,
+    'temp_store': 'DEFAULT',
+}
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+PRAGMA_VALUE_RE = re.compile(r'^-?\w+$')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite с настраиваемыми PRAGMA и режимом начала транзакций.
+
+    OPTIONS['pragmas'] дополняет DEFAULT_PRAGMAS, значение None отключает
+    PRAGMA. OPTIONS['transaction_mode'] = 'IMMEDIATE' сразу берёт
+    блокировку записи в начале atomic(): иначе транзакция, начавшая с
+    чтения, при первой записи получает «database is locked» без ожидания
+    busy_timeout. Постоянные соединения включаются обычным CONN_MAX_AGE.
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        return params
+
+    @property
+    def pragmas(self):
+        pragmas = {
+            **DEFAULT_PRAGMAS,
+            **self.settings_dict['OPTIONS'].get('pragmas', {}),
+        }
+        for name, value in pragmas.items():
+            if value is not None and not PRAGMA_VALUE_RE.match(str(value)):
+                raise ImproperlyConfigured(
+                    f'Недопустимое значение PRAGMA {name}: {value!r}.')
+        return {name: value for name, value in pragmas.items()
+                if value is not None}
+
+    @property
+    def transaction_mode(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode')
+        if mode is not None and mode.upper() not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                f'transaction_mode должен быть одним из '
+                f'{", ".join(TRANSACTION_MODES)}.')
+        return mode
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        mode = self.transaction_mode
+        self.cursor().execute(f'BEGIN {mode.upper()}' if mode else 'BEGIN')
@@ -0,0 +1,63 @@
+"""Файловый кэш, общий для процессов, и отдельный кэш для тестов и замеров.
+
+Кэш default общий для всех процессов сервера (CACHES в settings), поэтому
+тесты и benchmark_database, которые создают свои базы, работают с
+временным кэшем: иначе их данные попадали бы в страницы сайта, а
+cache.clear() в тестах сбрасывал бы кэш работающего сервера.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache.backends import filebased
+from django.test.utils import override_settings
+
+# Каталог кэша для дочерних процессов: settings берёт LOCATION отсюда.
+LOCATION_ENV = 'DJANGO_CACHE_LOCATION'
+
+
+class FileBasedCache(filebased.FileBasedCache):
+    """FileBasedCache, который проверяет MAX_ENTRIES не при каждой записи,
+    а раз в OPTIONS['CULL_INTERVAL'] записей (по умолчанию 100).
+
+    Проверка перечисляет весь каталог, и с тысячами файлов запись
+    дорожала бы до десятков миллисекунд. Цена — кэш может превысить
+    MAX_ENTRIES на CULL_INTERVAL записей каждого процесса, прежде чем
+    его проредят.
+    """
+
+    def __init__(self, dir, params):
+        super().__init__(dir, params)
+        self._cull_interval = int(
+            params.get('OPTIONS', {}).get('CULL_INTERVAL', 100))
+        self._sets = 0
+
+    def _cull(self):
+        self._sets += 1
+        if self._sets % self._cull_interval == 0:
+            super()._cull()
+
+
+@contextmanager
+def temporary_cache():
+    """Подменяет CACHES файловым кэшем во временном каталоге, который
+    видят и запущенные внутри дочерние процессы, и удаляет его на
+    выходе."""
+    old_location = os.environ.get(LOCATION_ENV)
+    with tempfile.TemporaryDirectory(prefix='django_cache_') as location:
+        os.environ[LOCATION_ENV] = location
+        try:
+            with override_settings(CACHES={
+                'default': {
+                    'BACKEND': 'core.cache.FileBasedCache',
+                    'LOCATION': location,
+                    'OPTIONS': settings.CACHES['default'].get('OPTIONS', {}),
+                },
+            }):
+                yield location
+        finally:
+            if old_location is None:
+                del os.environ[LOCATION_ENV]
+            else:
+                os.environ[LOCATION_ENV] = old_location
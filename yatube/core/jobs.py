@@ -0,0 +1,289 @@
+"""Фоновые задачи в таблице core.Job.
+
+enqueue() записывает вызов функции в очередь — в той же транзакции, что и
+изменения, из-за которых он понадобился, поэтому задача не потеряется и не
+выполнится над незафиксированными данными. Команда run_workers забирает
+задачи под аренду (leased_until), выполняет их в пуле потоков или
+процессов, повторяет упавшие с растущей паузой и после JOBS_MAX_ATTEMPTS
+попыток откладывает в мёртвые (status='dead').
+
+Задача — обычная функция уровня модуля; аргументы должны сериализоваться
+в JSON.
+"""
+import json
+import multiprocessing
+import os
+import socket
+import time
+import traceback
+from collections import defaultdict
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor,
+                                ThreadPoolExecutor, wait)
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+from django.db.models import Count, Min, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+from .stats import percentile
+
+
+POOLS = ('thread', 'process', 'sync')
+
+
+def job_name(func):
+    if isinstance(func, str):
+        return func
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def enqueue(func, *args, queue='default', delay=0, max_attempts=None,
+            **kwargs):
+    """Ставит вызов func(*args, **kwargs) в очередь queue. func — функция
+    или путь к ней; имена queue, delay и max_attempts заняты под
+    параметры самой задачи."""
+    return Job.objects.create(
+        queue=queue,
+        name=job_name(func),
+        payload=json.dumps({'args': args, 'kwargs': kwargs},
+                           ensure_ascii=False),
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def execute(name, payload):
+    """Выполняет задачу в потоке или процессе пула."""
+    close_old_connections()
+    try:
+        data = json.loads(payload)
+        import_string(name)(*data['args'], **data['kwargs'])
+    finally:
+        close_old_connections()
+
+
+def process_executor(max_workers=None):
+    """Пул процессов с настроенным Django. spawn, а не fork: дочерний
+    процесс не должен унаследовать открытые соединения с базой."""
+    connections.close_all()
+    return ProcessPoolExecutor(
+        max_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=django.setup,
+    )
+
+
+def retry_delay(attempts):
+    """Пауза перед следующей попыткой: удваивается с каждой неудачей."""
+    return min(settings.JOBS_RETRY_DELAY * 2 ** (attempts - 1),
+               settings.JOBS_RETRY_MAX_DELAY)
+
+
+def claim_jobs(queues, limit, worker, lease):
+    """Берёт до limit готовых задач и задачи с истёкшей арендой. На SQLite
+    транзакция начинается с BEGIN IMMEDIATE и двое воркеров не возьмут
+    одну задачу; на других базах то же даёт SELECT ... FOR UPDATE SKIP
+    LOCKED."""
+    now = timezone.now()
+    due = (Q(status=Job.QUEUED, run_at__lte=now)
+           | Q(status=Job.RUNNING, leased_until__lt=now))
+    with transaction.atomic():
+        jobs = Job.objects.select_for_update(skip_locked=True).filter(due)
+        if queues:
+            jobs = jobs.filter(queue__in=queues)
+        jobs = list(jobs.order_by('run_at')[:limit])
+        # Аренда истекла на последней попытке: воркер, скорее всего, упал
+        # на этой задаче, и больше её не берём.
+        Job.objects.filter(
+            pk__in=[job.pk for job in jobs
+                    if job.attempts >= job.max_attempts],
+        ).update(status=Job.DEAD, finished=now, leased_by='',
+                 leased_until=None, last_error='Истекла аренда задачи.')
+        jobs = [job for job in jobs if job.attempts < job.max_attempts]
+        for job in jobs:
+            job.status = Job.RUNNING
+            job.attempts += 1
+            job.leased_by = worker
+            job.leased_until = now + timedelta(seconds=lease)
+            job.started = now
+        Job.objects.bulk_update(jobs, [
+            'status', 'attempts', 'leased_by', 'leased_until', 'started'])
+    return jobs
+
+
+class QueueMetrics:
+    """Счётчики и времена задач одной очереди за работу воркера."""
+
+    def __init__(self):
+        self.done = 0
+        self.retried = 0
+        self.dead = 0
+        self.waits = []
+        self.durations = []
+
+    def report(self, elapsed):
+        report = {
+            'done': self.done,
+            'retried': self.retried,
+            'dead': self.dead,
+            'jobs_per_s': round(
+                (self.done + self.retried + self.dead) / max(elapsed, 1e-6),
+                2),
+        }
+        for title, values in (('wait', self.waits),
+                              ('run', self.durations)):
+            for percent in (50, 99):
+                report[f'{title}_p{percent}_ms'] = round(
+                    percentile(values, percent) * 1000, 1) if values else None
+        return report
+
+
+class Worker:
+    def __init__(self, queues=None, concurrency=None, pool='thread',
+                 lease=None, poll_interval=None):
+        if pool not in POOLS:
+            raise ValueError(f'pool должен быть одним из {", ".join(POOLS)}.')
+        self.queues = list(queues or [])
+        self.concurrency = concurrency or settings.JOBS_CONCURRENCY
+        self.pool = pool
+        self.lease = lease or settings.JOBS_LEASE
+        self.poll_interval = (settings.JOBS_POLL_INTERVAL
+                              if poll_interval is None else poll_interval)
+        self.name = f'{socket.gethostname()}:{os.getpid()}:{id(self):x}'
+        self.metrics = defaultdict(QueueMetrics)
+        self.stopping = False
+        self.started = None
+
+    def stop(self):
+        """Не брать новых задач и выйти, дождавшись начатых."""
+        self.stopping = True
+
+    def executor(self):
+        if self.pool == 'process':
+            return process_executor(self.concurrency)
+        return ThreadPoolExecutor(self.concurrency,
+                                  thread_name_prefix='job-worker')
+
+    def run(self, burst=False):
+        """Выполняет задачи, пока не вызван stop(); burst — только до
+        опустошения очереди."""
+        self.started = time.monotonic()
+        purge_done_jobs()
+        if self.pool == 'sync':
+            return self.run_sync(burst)
+        running = {}
+        with self.executor() as executor:
+            while True:
+                free = self.concurrency - len(running)
+                claimed = []
+                if free and not self.stopping:
+                    claimed = claim_jobs(self.queues, free, self.name,
+                                         self.lease)
+                for job in claimed:
+                    future = executor.submit(execute, job.name, job.payload)
+                    running[future] = job
+                if not running:
+                    if self.stopping or burst:
+                        return
+                    time.sleep(self.poll_interval)
+                    continue
+                finished, _ = wait(running, timeout=self.poll_interval,
+                                   return_when=FIRST_COMPLETED)
+                for future in finished:
+                    self.finish(running.pop(future), future.exception())
+                self.extend_leases(running.values())
+
+    def run_sync(self, burst):
+        while not self.stopping:
+            claimed = claim_jobs(self.queues, 1, self.name, self.lease)
+            if not claimed:
+                if burst:
+                    return
+                time.sleep(self.poll_interval)
+                continue
+            job = claimed[0]
+            try:
+                execute(job.name, job.payload)
+            except Exception as error:
+                self.finish(job, error)
+            else:
+                self.finish(job, None)
+
+    def extend_leases(self, jobs):
+        """Продлевает аренду долгих задач, пока они выполняются."""
+        now = timezone.now()
+        expiring = [job.pk for job in jobs
+                    if job.leased_until - now
+                    < timedelta(seconds=self.lease / 2)]
+        if expiring:
+            leased_until = now + timedelta(seconds=self.lease)
+            Job.objects.filter(pk__in=expiring, leased_by=self.name).update(
+                leased_until=leased_until)
+            for job in jobs:
+                if job.pk in expiring:
+                    job.leased_until = leased_until
+
+    def finish(self, job, error):
+        now = timezone.now()
+        metrics = self.metrics[job.queue]
+        metrics.waits.append((job.started - job.run_at).total_seconds())
+        metrics.durations.append((now - job.started).total_seconds())
+        job.leased_by = ''
+        job.leased_until = None
+        if error is None:
+            job.status = Job.DONE
+            job.finished = now
+            metrics.done += 1
+        else:
+            job.last_error = ''.join(traceback.format_exception(
+                type(error), error, error.__traceback__))
+            if job.attempts >= job.max_attempts:
+                job.status = Job.DEAD
+                job.finished = now
+                metrics.dead += 1
+            else:
+                job.status = Job.QUEUED
+                job.run_at = now + timedelta(
+                    seconds=retry_delay(job.attempts))
+                metrics.retried += 1
+        # Пока задача выполнялась, её аренда могла истечь и перейти к
+        # другому воркеру: тогда итог записывает он.
+        Job.objects.filter(pk=job.pk, leased_by=self.name).update(
+            status=job.status, leased_by=job.leased_by,
+            leased_until=job.leased_until, finished=job.finished,
+            last_error=job.last_error, run_at=job.run_at)
+
+    def report(self):
+        elapsed = time.monotonic() - self.started
+        return {queue: metrics.report(elapsed)
+                for queue, metrics in sorted(self.metrics.items())}
+
+
+def purge_done_jobs():
+    """Удаляет выполненные задачи старше JOBS_KEEP_DONE секунд; мёртвые
+    остаются для разбора."""
+    return Job.objects.filter(
+        status=Job.DONE,
+        finished__lt=timezone.now() - timedelta(
+            seconds=settings.JOBS_KEEP_DONE),
+    ).delete()[0]
+
+
+def queue_stats():
+    """Состояние очередей в базе: число задач по статусам и возраст самой
+    старой из готовых к выполнению."""
+    now = timezone.now()
+    stats = defaultdict(lambda: {status: 0 for status, _ in Job.STATUSES})
+    rows = Job.objects.order_by().values('queue', 'status').annotate(
+        total=Count('id'), oldest=Min('run_at'))
+    for row in rows:
+        queue = stats[row['queue']]
+        queue[row['status']] = row['total']
+        if row['status'] == Job.QUEUED and row['oldest'] <= now:
+            queue['oldest_s'] = round(
+                (now - row['oldest']).total_seconds(), 1)
+    return dict(sorted(stats.items()))
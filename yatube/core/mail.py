@@ -0,0 +1,115 @@
+"""Отложенная отправка почты.
+
+EMAIL_BACKEND = 'core.mail.SpoolBackend' не ходит на почтовый сервер во
+время запроса, а складывает готовые письма в таблицу OutgoingEmail. Команда
+send_queued_mail забирает их пачками и отправляет через MAIL_SPOOL_BACKEND
+по одному соединению, а неудачные повторяет с растущей паузой.
+"""
+from contextlib import suppress
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+
+class SpooledMessage:
+    """Уже собранное письмо: отдаёт сохранённые байты вместо сборки MIME."""
+
+    def __init__(self, data):
+        self.data = data
+
+    def as_bytes(self, unixfrom=False, linesep='\n'):
+        return self.data.replace(b'\n', linesep.encode())
+
+    def get_charset(self):
+        return None
+
+
+class SpooledEmail(EmailMessage):
+    def __init__(self, outgoing):
+        super().__init__(from_email=outgoing.from_email,
+                         to=outgoing.recipients.split())
+        self.data = bytes(outgoing.message)
+
+    def message(self):
+        return SpooledMessage(self.data)
+
+
+class SpoolBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        spooled = [
+            OutgoingEmail(
+                from_email=message.from_email,
+                recipients='\n'.join(message.recipients()),
+                message=message.message().as_bytes(),
+            )
+            for message in email_messages if message.recipients()
+        ]
+        OutgoingEmail.objects.bulk_create(spooled)
+        return len(spooled)
+
+
+def retry_delay(attempts):
+    """Пауза перед следующей попыткой: удваивается с каждой неудачей."""
+    return min(settings.MAIL_RETRY_DELAY * 2 ** (attempts - 1),
+               settings.MAIL_RETRY_MAX_DELAY)
+
+
+def claim_batch(batch_size):
+    """Берёт в работу пачку писем, которым пора уходить. Пока письма
+    отправляются, их следующая попытка отодвинута на MAIL_LEASE секунд,
+    поэтому параллельный воркер их не возьмёт, а письма упавшего воркера
+    после этого срока вернутся в очередь."""
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutgoingEmail.objects
+            .filter(sent__isnull=True, next_attempt__lte=now,
+                    attempts__lt=settings.MAIL_MAX_ATTEMPTS)
+            .order_by('next_attempt')[:batch_size]
+        )
+        OutgoingEmail.objects.filter(
+            pk__in=[outgoing.pk for outgoing in batch],
+        ).update(next_attempt=now + timedelta(seconds=settings.MAIL_LEASE))
+    return batch
+
+
+def send_queued_mail(batch_size=None):
+    """Отправляет одну пачку писем и возвращает (отправлено, отложено)."""
+    batch = claim_batch(batch_size or settings.MAIL_BATCH_SIZE)
+    if not batch:
+        return 0, 0
+    sent = 0
+    connection = get_connection(settings.MAIL_SPOOL_BACKEND)
+    try:
+        for outgoing in batch:
+            try:
+                # Открытое соединение open() не трогает, а send_messages
+                # не закрывает соединение, которое открыло не оно.
+                connection.open()
+                connection.send_messages([SpooledEmail(outgoing)])
+            except Exception as error:
+                outgoing.attempts += 1
+                outgoing.last_error = f'{type(error).__name__}: {error}'
+                outgoing.next_attempt = timezone.now() + timedelta(
+                    seconds=retry_delay(outgoing.attempts))
+                outgoing.save(update_fields=(
+                    'attempts', 'last_error', 'next_attempt'))
+                # Сервер мог оборвать соединение: следующее письмо
+                # откроет новое.
+                with suppress(Exception):
+                    connection.close()
+            else:
+                # Отметка сразу после отправки: если воркер упадёт посреди
+                # пачки, отправленные письма не уйдут второй раз.
+                OutgoingEmail.objects.filter(pk=outgoing.pk).update(
+                    sent=timezone.now())
+                sent += 1
+    finally:
+        connection.close()
+    return sent, len(batch) - sent
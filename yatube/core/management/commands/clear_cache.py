@@ -0,0 +1,11 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = ('Сбрасывает общий кэш: после выкладки страницы и карточки в нём '
+            'отрисованы прежними шаблонами.')
+
+    def handle(self, *args, **options):
+        cache.clear()
+        self.stdout.write('Кэш сброшен.')
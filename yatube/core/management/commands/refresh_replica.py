@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.routers import refresh_replica
+
+
+class Command(BaseCommand):
+    help = 'Обновляет реплику базы для чтения лент копией основной базы.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Обновлять раз в столько секунд, пока не прервут.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            started = time.monotonic()
+            target = refresh_replica()
+            self.stdout.write(
+                f'Реплика {target} обновлена за '
+                f'{time.monotonic() - started:.2f} с.')
+            if not options['interval']:
+                return
+            time.sleep(max(0, options['interval']
+                           - (time.monotonic() - started)))
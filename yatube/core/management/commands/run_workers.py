@@ -0,0 +1,76 @@
+import json
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.jobs import POOLS, Worker, queue_stats
+
+
+class Command(BaseCommand):
+    help = ('Выполняет фоновые задачи из очереди в пуле потоков или '
+            'процессов и выводит метрики по очередям.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queues',
+            help='Очереди через запятую; по умолчанию все.',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=settings.JOBS_CONCURRENCY,
+            help='Сколько задач выполнять одновременно.',
+        )
+        parser.add_argument(
+            '--pool',
+            choices=POOLS,
+            default='thread',
+            help='thread — потоки, process — процессы (для задач, '
+                 'занимающих процессор), sync — по одной в этом потоке.',
+        )
+        parser.add_argument(
+            '--lease',
+            type=float,
+            default=settings.JOBS_LEASE,
+            help='На сколько секунд задача закрепляется за воркером.',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Выйти, когда очередь опустеет.',
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Только вывести состояние очередей в JSON.',
+        )
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            self.stdout.write(json.dumps(queue_stats(), indent=2))
+            return
+        queues = [queue.strip() for queue in
+                  (options['queues'] or '').split(',') if queue.strip()]
+        try:
+            worker = Worker(queues, options['concurrency'], options['pool'],
+                            options['lease'])
+        except ValueError as error:
+            raise CommandError(error)
+        try:
+            signal.signal(signal.SIGTERM, lambda *args: worker.stop())
+        except ValueError:
+            # Не из главного потока обработчик не поставить.
+            pass
+        try:
+            worker.run(burst=options['burst'])
+        except KeyboardInterrupt:
+            worker.stop()
+        for queue, report in worker.report().items():
+            self.stdout.write(
+                f'{queue}: выполнено {report["done"]}, отложено '
+                f'{report["retried"]}, отброшено {report["dead"]}, '
+                f'{report["jobs_per_s"]} задач/с, ожидание p50 '
+                f'{report["wait_p50_ms"]} мс, выполнение p50 '
+                f'{report["run_p50_ms"]} мс, p99 {report["run_p99_ms"]} мс'
+            )
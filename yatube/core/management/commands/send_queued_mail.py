@@ -0,0 +1,37 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.mail import send_queued_mail
+
+
+class Command(BaseCommand):
+    help = ('Отправляет письма из очереди пачками по одному соединению '
+            'с почтовым сервером.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.MAIL_BATCH_SIZE,
+            help='Сколько писем отправлять за одно соединение.',
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Проверять очередь раз в столько секунд, пока не прервут.',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent, deferred = send_queued_mail(options['batch_size'])
+            if sent or deferred:
+                self.stdout.write(
+                    f'Отправлено писем: {sent}, отложено: {deferred}.')
+            if sent + deferred == options['batch_size']:
+                # Очередь могла не кончиться: следующая пачка без паузы.
+                continue
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
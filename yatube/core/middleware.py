@@ -0,0 +1,327 @@
+import json
+import logging
+import mimetypes
+import os
+import re
+import time
+import warnings
+import zlib
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from .routers import is_pinned, read_database, use_replica
+
+
+logger = logging.getLogger(__name__)
+
+IN_LIST = re.compile(r'\bIN \((?:%s|\?)(?:, (?:%s|\?))*\)')
+STRING = re.compile(r"'(?:[^']|'')*'")
+NUMBER = re.compile(r'\b\d+\b')
+SPACES = re.compile(r'\s+')
+
+
+class RepeatedQueriesWarning(UserWarning):
+    pass
+
+
+class RepeatedQueriesError(Exception):
+    pass
+
+
+def fingerprint(sql):
+    """Форма запроса без значений: числа и строки заменены на ?, списки
+    IN (...) любой длины сведены к одному виду."""
+    sql = STRING.sub('?', sql)
+    sql = NUMBER.sub('?', sql)
+    sql = IN_LIST.sub('IN (...)', sql)
+    return SPACES.sub(' ', sql).strip()
+
+
+class QueryRecorder:
+    """execute_wrapper: считает запросы, их время и повторы формы."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.shapes[fingerprint(sql)] += 1
+
+    def repeated(self, limit):
+        return {sql: times for sql, times in self.shapes.most_common()
+                if times > limit}
+
+
+class SQLInstrumentationMiddleware:
+    """Считает SQL-запросы каждого запроса и отдаёт итог в заголовке
+    Server-Timing и в строке лога. Если одна форма запроса выполнилась
+    больше SQL_REPEAT_LIMIT раз (типичный N+1), пишет предупреждение,
+    а при SQL_REPEAT_RAISE — падает, чтобы это ловили тесты.
+
+    Запросы, выполненные при отдаче StreamingHttpResponse, уже после
+    выхода из view, не учитываются."""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SQL_INSTRUMENTATION', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total = time.perf_counter() - started
+        response['Server-Timing'] = (
+            f'sql;dur={recorder.duration * 1000:.1f};'
+            f'desc="{recorder.count} queries", '
+            f'total;dur={total * 1000:.1f}'
+        )
+        limit = getattr(settings, 'SQL_REPEAT_LIMIT', 5)
+        repeated = recorder.repeated(limit)
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': recorder.count,
+            'sql_ms': round(recorder.duration * 1000, 1),
+            'total_ms': round(total * 1000, 1),
+            'repeated': repeated,
+        }
+        logger.log(logging.WARNING if repeated else logging.INFO,
+                   json.dumps(record, ensure_ascii=False))
+        if repeated:
+            message = (f'{request.method} {request.path}: запросы '
+                       f'повторились больше {limit} раз: {repeated}')
+            if getattr(settings, 'SQL_REPEAT_RAISE', False):
+                raise RepeatedQueriesError(message)
+            warnings.warn(message, RepeatedQueriesWarning)
+        return response
+
+
+class ReplicaMiddleware:
+    """Читает view из REPLICA_VIEWS с реплики, а после записи на
+    REPLICA_PIN_SECONDS секунд закрепляет пользователя за основной базой
+    (cookie REPLICA_PIN_COOKIE), чтобы автор сразу видел свой пост."""
+
+    safe_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = read_database.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            read_database.reset(token)
+        match = request.resolver_match
+        wrote = (request.method not in self.safe_methods
+                 or match and match.view_name in settings.REPLICA_PIN_VIEWS)
+        if wrote and response.status_code < 400:
+            expires = time.time() + settings.REPLICA_PIN_SECONDS
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, f'{expires:.0f}',
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (request.method in ('GET', 'HEAD')
+                and request.resolver_match.view_name
+                in settings.REPLICA_VIEWS
+                and not is_pinned(request)):
+            use_replica()
+
+
+class StaticFilesMiddleware:
+    """Отдаёт собранную collectstatic статику из STATIC_ROOT, минуя
+    остальные middleware и view. Файлы с хэшем в имени неизменяемы и
+    кэшируются на год, исходные имена проверяются каждый раз. Если клиент
+    принимает br или gzip и у файла есть такая копия, отдаётся она.
+
+    Знает только файлы из манифеста, поэтому без collectstatic ничего не
+    делает и запросы идут дальше, например к staticfiles runserver."""
+
+    immutable = f'public, max-age={365 * 24 * 60 * 60}, immutable'
+    # При равном q выбирается brotli: он сжимает лучше.
+    preferred_encodings = {'br': '.br', 'gzip': '.gz'}
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.files = None
+
+    def load_files(self):
+        from django.contrib.staticfiles.storage import staticfiles_storage
+
+        encodings = getattr(staticfiles_storage, 'encodings', {})
+        files = {}
+        for original, hashed in staticfiles_storage.hashed_files.items():
+            files[original] = (original, (), False)
+            files[hashed] = (hashed, tuple(encodings.get(hashed, ())), True)
+        return files
+
+    def __call__(self, request):
+        if self.files is None:
+            self.files = self.load_files()
+        if (request.method in ('GET', 'HEAD')
+                and request.path.startswith(settings.STATIC_URL)):
+            name = request.path[len(settings.STATIC_URL):]
+            if name in self.files:
+                return self.serve(request, *self.files[name])
+        return self.get_response(request)
+
+    def serve(self, request, name, encodings, immutable):
+        from django.contrib.staticfiles.storage import staticfiles_storage
+
+        path = staticfiles_storage.path(name)
+        encoding = negotiate_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''),
+            [encoding for encoding in self.preferred_encodings
+             if encoding in encodings])
+        stat = os.stat(path)
+        if not immutable and not was_modified_since(
+                request.META.get('HTTP_IF_MODIFIED_SINCE'),
+                stat.st_mtime, stat.st_size):
+            return HttpResponseNotModified()
+        content_type = (mimetypes.guess_type(name)[0]
+                        or 'application/octet-stream')
+        if encoding is not None:
+            path += self.preferred_encodings[encoding]
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+        if 'Content-Disposition' in response:
+            del response['Content-Disposition']
+        if encoding is not None:
+            response['Content-Encoding'] = encoding
+        if encodings:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Cache-Control'] = self.immutable if immutable else 'no-cache'
+        return response
+
+
+class CompressionMiddleware:
+    """Сжимает текстовые ответы в gzip или deflate по Accept-Encoding.
+    Потоковые ответы сжимаются по частям: каждая часть отдаётся клиенту
+    сразу. Тела меньше COMPRESSION_MIN_SIZE не сжимаются.
+
+    Если view пометил ответ атрибутом compressed_cache = (ключ, время
+    жизни), как это делает кэш страниц, сжатое тело хранится в кэше под
+    '<ключ>:<кодировка>' и при следующих попаданиях не сжимается снова."""
+
+    encodings = ('gzip', 'deflate')
+    # deflate в HTTP — поток zlib, gzip — с заголовком gzip.
+    wbits = {'gzip': 16 + zlib.MAX_WBITS, 'deflate': zlib.MAX_WBITS}
+    compressible_types = ('text/', 'application/json', 'application/xml',
+                          'application/javascript', 'application/rss+xml',
+                          'application/atom+xml')
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if not self.compressible(response):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''), self.encodings)
+        if encoding is None:
+            return response
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content, self.wbits[encoding])
+            if response.has_header('Content-Length'):
+                del response['Content-Length']
+        else:
+            if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+                return response
+            response.content = self.compressed_content(response, encoding)
+            response['Content-Length'] = str(len(response.content))
+        # Сжатое тело уже не совпадает побайтно с тем, для которого
+        # считался ETag.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
+
+    def compressible(self, response):
+        content_type = response.get('Content-Type', '')
+        return (response.status_code == 200
+                and not response.has_header('Content-Encoding')
+                and content_type.startswith(self.compressible_types))
+
+    def compressed_content(self, response, encoding):
+        compressed_cache = getattr(response, 'compressed_cache', None)
+        if compressed_cache is None:
+            return compress_bytes(response.content, self.wbits[encoding])
+        key, timeout = compressed_cache
+        key = f'{key}:{encoding}'
+        content = cache.get(key)
+        if content is None:
+            content = compress_bytes(response.content, self.wbits[encoding])
+            cache.set(key, content, timeout)
+        return content
+
+
+def compressor(wbits):
+    return zlib.compressobj(settings.COMPRESSION_LEVEL, zlib.DEFLATED, wbits)
+
+
+def compress_bytes(content, wbits):
+    compress = compressor(wbits)
+    return compress.compress(content) + compress.flush()
+
+
+def compress_stream(chunks, wbits):
+    """Сжимает поток частей; после каждой части сбрасывает буфер
+    компрессора, чтобы клиент не ждал конца ответа."""
+    compress = compressor(wbits)
+    for chunk in chunks:
+        data = compress.compress(chunk) + compress.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compress.flush()
+
+
+def negotiate_encoding(accept_encoding, available):
+    """Кодировка из available с наибольшим q в Accept-Encoding (явно или
+    через *); при равном q — первая в available. None — только identity."""
+    qualities = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            key, _, value = param.strip().partition('=')
+            if key == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[name.strip().lower()] = quality
+    best, best_quality = None, 0
+    for encoding in available:
+        quality = qualities.get(encoding, qualities.get('*', 0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_job'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateLimitBucket',
+            fields=[
+                ('key', models.CharField(help_text='Маршрут и адрес или пользователь', max_length=255, primary_key=True, serialize=False, verbose_name='Ключ')),
+                ('tokens', models.FloatField(verbose_name='Запас запросов')),
+                ('updated', models.FloatField(help_text='Unix-время последнего запроса', verbose_name='Время списания')),
+                ('expires', models.FloatField(help_text='Unix-время, после которого ведро снова полное и строку можно удалить', verbose_name='Полное после')),
+            ],
+            options={
+                'verbose_name': 'Ведро ограничения частоты',
+                'verbose_name_plural': 'Вёдра ограничения частоты',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='ratelimitbucket',
+            index=models.Index(fields=['expires'], name='ratelimit_expires_idx'),
+        ),
+    ]
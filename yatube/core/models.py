@@ -0,0 +1,167 @@
+from django.db import models
+from django.utils import timezone
+
+
+class OutgoingEmail(models.Model):
+    from_email = models.CharField(
+        max_length=254,
+        verbose_name='Отправитель',
+    )
+    recipients = models.TextField(
+        verbose_name='Получатели',
+        help_text='Адреса получателей, включая скрытые, по одному в строке',
+    )
+    message = models.BinaryField(
+        verbose_name='Письмо',
+        help_text='Готовое письмо в формате MIME',
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата постановки в очередь',
+    )
+    next_attempt = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Следующая попытка',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Неудачных попыток',
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка',
+    )
+    sent = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Дата отправки',
+    )
+
+    class Meta:
+        ordering = ['next_attempt']
+        indexes = [
+            models.Index(fields=['sent', 'next_attempt'],
+                         name='outgoing_email_due_idx'),
+        ]
+        verbose_name = 'Исходящее письмо'
+        verbose_name_plural = 'Исходящие письма'
+
+    def __str__(self):
+        return f'{self.from_email} → {", ".join(self.recipients.split())}'
+
+
+class Job(models.Model):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    DEAD = 'dead'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнено'),
+        (DEAD, 'Отброшено'),
+    )
+
+    queue = models.CharField(
+        max_length=50,
+        default='default',
+        verbose_name='Очередь',
+    )
+    name = models.CharField(
+        max_length=200,
+        verbose_name='Функция',
+        help_text='Полный путь к функции задачи',
+    )
+    payload = models.TextField(
+        verbose_name='Аргументы',
+        help_text='Позиционные и именованные аргументы в JSON',
+    )
+    status = models.CharField(
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED,
+        verbose_name='Состояние',
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток',
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Предел попыток',
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Выполнить не раньше',
+    )
+    leased_by = models.CharField(
+        max_length=100,
+        blank=True,
+        verbose_name='Воркер',
+    )
+    leased_until = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Аренда до',
+        help_text='После этого срока задачу может взять другой воркер',
+    )
+    created = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата постановки в очередь',
+    )
+    started = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Начало последней попытки',
+    )
+    finished = models.DateTimeField(
+        blank=True,
+        null=True,
+        verbose_name='Дата завершения',
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка',
+    )
+
+    class Meta:
+        ordering = ['run_at']
+        indexes = [
+            models.Index(fields=['status', 'queue', 'run_at'],
+                         name='job_due_idx'),
+        ]
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+
+    def __str__(self):
+        return f'{self.queue}: {self.name} ({self.get_status_display()})'
+
+
+class RateLimitBucket(models.Model):
+    key = models.CharField(
+        max_length=255,
+        primary_key=True,
+        verbose_name='Ключ',
+        help_text='Маршрут и адрес или пользователь',
+    )
+    tokens = models.FloatField(
+        verbose_name='Запас запросов',
+    )
+    updated = models.FloatField(
+        verbose_name='Время списания',
+        help_text='Unix-время последнего запроса',
+    )
+    expires = models.FloatField(
+        verbose_name='Полное после',
+        help_text='Unix-время, после которого ведро снова полное и строку '
+                  'можно удалить',
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['expires'], name='ratelimit_expires_idx'),
+        ]
+        verbose_name = 'Ведро ограничения частоты'
+        verbose_name_plural = 'Вёдра ограничения частоты'
+
+    def __str__(self):
+        return self.key
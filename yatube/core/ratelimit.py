@@ -0,0 +1,172 @@
+"""Ограничение частоты запросов к записи и входу алгоритмом token bucket.
+
+RATE_LIMITS сопоставляет имени маршрута методы и список ограничений вида
+'<ключ>:<число>/<s|m|h|d>': 'ip' — на адрес клиента, 'user' — на
+вошедшего пользователя (для анонима — на адрес), 'route' — на весь
+маршрут сразу. Ведро вмещает <число> запросов и наполняется равномерно за
+период.
+
+Общее для всех процессов состояние вёдер хранится в таблице
+core.RateLimitBucket, а не в кэше: кэш при переполнении удаляет записи
+наугад, и вытесненное ведро снова становилось бы полным. Перед базой стоит
+копия ведра в памяти процесса: она наполняется с той же скоростью, а
+другие процессы могут её только опустошать, поэтому пустая копия — уже
+точный отказ, и клиент, который упёрся в лимит, до базы не доходит.
+Ограничиваются маршруты записи, так что база на них пишется и без того.
+Строки вёдер, снова полных, удаляются раз в PURGE_EVERY списаний.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.core.exceptions import ImproperlyConfigured
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.http import HttpResponse
+
+from .models import RateLimitBucket
+
+
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+SCOPES = ('ip', 'user', 'route')
+# Проверка идёт от самых узких ключей: отказ по адресу не должен тратить
+# общий для всех запас маршрута.
+SCOPE_ORDER = {scope: number for number, scope in enumerate(SCOPES)}
+PURGE_EVERY = 1000
+
+
+def parse_limit(limit):
+    """'ip:10/m' -> ('ip', 10, 60)."""
+    try:
+        scope, rate = limit.split(':')
+        count, period = rate.split('/')
+        count, period = int(count), PERIODS[period]
+    except (KeyError, ValueError):
+        raise ImproperlyConfigured(f'Неверное ограничение частоты: {limit!r}.')
+    if scope not in SCOPES or count < 1:
+        raise ImproperlyConfigured(f'Неверное ограничение частоты: {limit!r}.')
+    return scope, count, period
+
+
+def take(state, capacity, period, now):
+    """Пытается взять из ведра один запрос. Возвращает новое состояние
+    (запас, время) и сколько секунд ждать, если запаса нет (иначе 0)."""
+    tokens, updated = state or (capacity, now)
+    tokens = min(capacity, tokens + (now - updated) * capacity / period)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+    return (tokens, now), (1 - tokens) * period / capacity
+
+
+def purge_buckets(now=None):
+    """Удаляет строки вёдер, которые успели снова наполниться."""
+    if now is None:
+        now = time.time()
+    return RateLimitBucket.objects.filter(expires__lt=now).delete()[0]
+
+
+class RateLimiter:
+    def __init__(self, size=None):
+        self.size = size or getattr(settings, 'RATE_LIMIT_LOCAL_BUCKETS',
+                                    10000)
+        self.local = OrderedDict()
+        self.lock = threading.Lock()
+        self.writes = 0
+
+    def hit(self, key, capacity, period):
+        """Списывает запрос с ведра key; 0 — пропустить, иначе секунды до
+        следующей попытки."""
+        now = time.time()
+        with self.lock:
+            _, wait = take(self.local.get(key), capacity, period, now)
+        if wait:
+            return wait
+        with transaction.atomic():
+            bucket = RateLimitBucket.objects.select_for_update().filter(
+                key=key).first()
+            if bucket is None:
+                bucket = RateLimitBucket(key=key)
+                state = None
+            else:
+                state = (bucket.tokens, bucket.updated)
+            state, wait = take(state, capacity, period, now)
+            bucket.tokens, bucket.updated = state
+            bucket.expires = now + period
+            bucket.save(force_insert=bucket._state.adding)
+        with self.lock:
+            self.local[key] = state
+            self.local.move_to_end(key)
+            while len(self.local) > self.size:
+                self.local.popitem(last=False)
+            self.writes += 1
+            purge = self.writes % PURGE_EVERY == 0
+        if purge:
+            purge_buckets(now)
+        return wait
+
+    def clear(self):
+        with self.lock:
+            self.local.clear()
+
+
+limiter = RateLimiter()
+
+
+@receiver(setting_changed)
+def reset_limiter(setting, **kwargs):
+    if setting == 'RATE_LIMITS':
+        limiter.clear()
+
+
+def client_ip(request):
+    header = getattr(settings, 'RATE_LIMIT_IP_HEADER', None)
+    if header and request.META.get(header):
+        return request.META[header].split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def limit_key(request, route, scope):
+    if scope == 'user':
+        # Пользователь из сессии, без запроса к таблице пользователей.
+        user_id = request.session.get(SESSION_KEY)
+        if user_id is not None:
+            return f'ratelimit:{route}:user:{user_id}'
+        scope = 'ip'
+    if scope == 'ip':
+        return f'ratelimit:{route}:ip:{client_ip(request)}'
+    return f'ratelimit:{route}'
+
+
+class RateLimitMiddleware:
+    """Отвечает 429 с Retry-After ещё до view, а значит до запросов к базе
+    и проверки пароля."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        route = request.resolver_match.view_name
+        rule = getattr(settings, 'RATE_LIMITS', {}).get(route)
+        if rule is None or request.method not in rule['methods']:
+            return None
+        limits = sorted(map(parse_limit, rule['limits']),
+                        key=lambda limit: SCOPE_ORDER[limit[0]])
+        for scope, count, period in limits:
+            wait = limiter.hit(limit_key(request, route, scope),
+                               count, period)
+            if wait:
+                response = HttpResponse(
+                    'Слишком много запросов. Повторите попытку позже.',
+                    content_type='text/plain; charset=utf-8',
+                    status=429,
+                )
+                response['Retry-After'] = str(math.ceil(wait))
+                return response
+        return None
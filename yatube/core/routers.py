@@ -0,0 +1,104 @@
+"""Чтение лент с реплики базы.
+
+Реплика — копия файла SQLite, которую периодически обновляет команда
+refresh_replica. На реплику уходят только чтения view из REPLICA_VIEWS:
+ReplicaMiddleware включает её на время такого запроса. Всё остальное —
+записи, авторизация, сессии, команды и тесты — работает с основной базой.
+"""
+import os
+import sqlite3
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+read_database = ContextVar('read_database', default=None)
+
+
+def replica_alias():
+    return getattr(settings, 'REPLICA_DATABASE', 'replica')
+
+
+def replica_snapshot_time():
+    """Момент снимка реплики (mtime файла) или None, если реплики нет."""
+    database = settings.DATABASES.get(replica_alias())
+    if database is None:
+        return None
+    try:
+        return os.path.getmtime(database['NAME'])
+    except (OSError, TypeError, ValueError):
+        return None
+
+
+def use_replica():
+    """Направляет чтения текущего запроса на реплику, если она есть."""
+    if replica_snapshot_time() is not None:
+        read_database.set(replica_alias())
+
+
+def use_primary_if_stale(changed):
+    """Возвращает чтения на основную базу, если данные страницы менялись
+    (changed — datetime) позже снимка реплики."""
+    if read_database.get() != replica_alias():
+        return
+    snapshot = replica_snapshot_time()
+    if snapshot is None or snapshot < changed.timestamp():
+        read_database.set(DEFAULT_DB_ALIAS)
+
+
+def pin_expires(request):
+    try:
+        return float(request.COOKIES.get(settings.REPLICA_PIN_COOKIE, 0))
+    except ValueError:
+        return 0
+
+
+def is_pinned(request):
+    return pin_expires(request) > time.time()
+
+
+class PrimaryReplicaRouter:
+    # Пользователи и сессии читаются только с основной базы: иначе
+    # только что вошедший пользователь мог бы оказаться анонимом. Очереди
+    # писем и задач core тоже живут только в ней.
+    primary_apps = {'auth', 'sessions', 'contenttypes', 'admin', 'core'}
+
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label in self.primary_apps:
+            return DEFAULT_DB_ALIAS
+        return read_database.get() or DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def refresh_replica():
+    """Снимает копию основной базы через backup API SQLite и атомарно
+    подменяет ею файл реплики. mtime копии — момент начала снимка: всё,
+    что изменилось позже, use_primary_if_stale читает с основной базы."""
+    target = settings.DATABASES[replica_alias()]['NAME']
+    temporary = f'{target}.tmp'
+    if os.path.exists(temporary):
+        os.remove(temporary)
+    started = time.time()
+    connection = connections[DEFAULT_DB_ALIAS]
+    connection.ensure_connection()
+    destination = sqlite3.connect(temporary)
+    try:
+        connection.connection.backup(destination)
+        # Реплика без WAL: иначе после подмены файла рядом мог бы остаться
+        # журнал от прежней копии.
+        destination.execute('PRAGMA journal_mode = DELETE')
+    finally:
+        destination.close()
+    os.utime(temporary, (started, started))
+    os.replace(temporary, target)
+    return target
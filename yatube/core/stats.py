@@ -0,0 +1,6 @@
+def percentile(values, percent):
+    """Перцентиль по ближайшему рангу; values не обязаны быть
+    отсортированы."""
+    values = sorted(values)
+    rank = max(1, -(-len(values) * percent // 100))
+    return values[rank - 1]
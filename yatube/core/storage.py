@@ -0,0 +1,92 @@
+"""Статика с хэшем содержимого в имени и заранее сжатыми копиями.
+
+collectstatic складывает файлы в STATIC_ROOT, переименовывает их в
+name.<md5>.ext, пишет манифест staticfiles.json, по которому {% static %}
+подставляет новые имена, и рядом с каждым сжимаемым файлом кладёт .gz, а
+при установленном пакете brotli — и .br. Какие копии есть у файла,
+записано в манифесте (ключ encodings), и StaticFilesMiddleware отдаёт
+подходящую без обращений к диску.
+"""
+import gzip
+import json
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Форматы, которые уже сжаты: повторное сжатие их только увеличит.
+COMPRESSED_EXTENSIONS = {
+    'png', 'jpg', 'jpeg', 'gif', 'webp', 'avif', 'woff', 'woff2', 'gz',
+    'br', 'zip', 'mp3', 'mp4', 'webm',
+}
+# Сжатая копия сохраняется, только если она меньше этой доли оригинала.
+MAX_COMPRESSED_RATIO = 0.95
+
+
+def compressors():
+    yield 'gzip', '.gz', lambda data: gzip.compress(data, 9, mtime=0)
+    if brotli is not None:
+        yield 'br', '.br', brotli.compress
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.encodings = self.load_encodings()
+
+    def load_encodings(self):
+        content = self.read_manifest()
+        if content is None:
+            return {}
+        return json.loads(content).get('encodings', {})
+
+    def save_manifest(self):
+        payload = {
+            'paths': self.hashed_files,
+            'encodings': getattr(self, 'encodings', {}),
+            'version': self.manifest_version,
+        }
+        if self.exists(self.manifest_name):
+            self.delete(self.manifest_name)
+        self._save(self.manifest_name,
+                   ContentFile(json.dumps(payload).encode()))
+
+    def stored_name(self, name):
+        # Пока collectstatic не запускали, манифеста нет, и статика
+        # отдаётся под исходными именами, как без этого хранилища.
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        self.encodings = {}
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in sorted(set(self.hashed_files.values())):
+            encodings = self.compress(name)
+            if encodings:
+                self.encodings[name] = encodings
+        self.save_manifest()
+
+    def compress(self, name):
+        """Кладёт сжатые копии рядом с файлом; возвращает их кодировки."""
+        if name.rsplit('.', 1)[-1].lower() in COMPRESSED_EXTENSIONS:
+            return []
+        with self.open(name) as original:
+            data = original.read()
+        encodings = []
+        for encoding, suffix, compress in compressors():
+            compressed = compress(data)
+            if len(compressed) > len(data) * MAX_COMPRESSED_RATIO:
+                continue
+            if self.exists(name + suffix):
+                self.delete(name + suffix)
+            self._save(name + suffix, ContentFile(compressed))
+            encodings.append(encoding)
+        return encodings
@@ -0,0 +1,17 @@
+from django.test.runner import DiscoverRunner
+
+from .cache import temporary_cache
+
+
+class TestRunner(DiscoverRunner):
+    """DiscoverRunner, который на время тестов подменяет общий кэш
+    временным (core.cache.temporary_cache)."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self.cache = temporary_cache()
+        self.cache.__enter__()
+
+    def teardown_test_environment(self, **kwargs):
+        self.cache.__exit__(None, None, None)
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,34 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client
+
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class PostsFixtureMixin:
+    """Автор, группа и его пост для тестов core на страницах posts. Перед
+    каждым тестом кэш сбрасывается, а authorized_client входит под
+    автором; self.client остаётся анонимным."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.test_author = User.objects.create_user(username='test-username')
+        cls.test_group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый текст',
+            author=cls.test_author,
+            group=cls.test_group,
+        )
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.test_author)
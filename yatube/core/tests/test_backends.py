@@ -0,0 +1,34 @@
+from unittest import mock
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection
+from django.test import TestCase
+
+from core.backends.sqlite3.base import DEFAULT_PRAGMAS
+
+
+class SQLiteBackendTest(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_applied(self):
+        self.assertEqual(self.pragma('busy_timeout'),
+                         DEFAULT_PRAGMAS['busy_timeout'])
+        self.assertEqual(self.pragma('cache_size'),
+                         DEFAULT_PRAGMAS['cache_size'])
+        # 1 — NORMAL.
+        self.assertEqual(self.pragma('synchronous'), 1)
+
+    def test_bad_options(self):
+        options = connection.settings_dict['OPTIONS']
+        bad_options = {
+            'pragmas': {'pragmas': {'cache_size': '1; DROP TABLE posts_post'}},
+            'transaction_mode': {'transaction_mode': 'LATER'},
+        }
+        for attribute, bad in bad_options.items():
+            with self.subTest(attribute=attribute):
+                with mock.patch.dict(options, bad):
+                    with self.assertRaises(ImproperlyConfigured):
+                        getattr(connection, attribute)
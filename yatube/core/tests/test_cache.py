@@ -0,0 +1,24 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from core.cache import FileBasedCache
+
+
+class FileBasedCacheTestCase(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.location = directory.name
+        self.cache = FileBasedCache(self.location, {'OPTIONS': {
+            'MAX_ENTRIES': 4, 'CULL_FREQUENCY': 2, 'CULL_INTERVAL': 5}})
+
+    def test_culls_once_per_interval(self):
+        """Каталог перечисляется раз в CULL_INTERVAL записей, поэтому до
+        прореживания кэш может превысить MAX_ENTRIES."""
+        for number in range(4):
+            self.cache.set(f'key{number}', number)
+        self.assertEqual(len(os.listdir(self.location)), 4)
+        self.cache.set('key4', 4)
+        self.assertEqual(len(os.listdir(self.location)), 3)
@@ -0,0 +1,93 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from core.jobs import claim_jobs, enqueue
+from core.models import Job
+
+
+JOB_CALLS = []
+
+
+def record_job(value, suffix=''):
+    JOB_CALLS.append(f'{value}{suffix}')
+
+
+def failing_job():
+    raise ValueError('сбой задачи')
+
+
+class RunWorkersCommandTest(TestCase):
+    def setUp(self):
+        JOB_CALLS.clear()
+
+    def run_workers(self, *args):
+        out = StringIO()
+        call_command('run_workers', '--burst', '--pool', 'sync', *args,
+                     stdout=out)
+        return out.getvalue()
+
+    def test_enqueued_jobs_run_once(self):
+        enqueue(record_job, 'первая', suffix='!')
+        enqueue(record_job, 'вторая', queue='other')
+        self.run_workers('--queues', 'default')
+        self.assertEqual(JOB_CALLS, ['первая!'])
+        output = self.run_workers()
+        self.assertEqual(JOB_CALLS, ['первая!', 'вторая'])
+        self.assertIn('other: выполнено 1', output)
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
+        self.run_workers()
+        self.assertEqual(len(JOB_CALLS), 2)
+
+    def test_failed_job_is_retried_then_dead(self):
+        job = enqueue(failing_job, max_attempts=2)
+        output = self.run_workers()
+        self.assertIn('отложено 1', output)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn('сбой задачи', job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+
+        Job.objects.update(run_at=timezone.now())
+        output = self.run_workers()
+        self.assertIn('отброшено 1', output)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DEAD, 2))
+        Job.objects.update(run_at=timezone.now())
+        self.assertEqual(self.run_workers(), '')
+
+    def test_expired_lease_is_reclaimed(self):
+        job = enqueue(record_job, 'задача')
+        [claimed] = claim_jobs([], 10, 'упавший воркер', lease=60)
+        self.assertEqual(claim_jobs([], 10, 'другой воркер', lease=60), [])
+        Job.objects.update(leased_until=timezone.now() - timedelta(1))
+        self.run_workers()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 2))
+        self.assertEqual(JOB_CALLS, ['задача'])
+
+    def test_stats(self):
+        enqueue(record_job, 'задача', queue='cache')
+        enqueue(record_job, 'позже', queue='cache', delay=60)
+        stats = json.loads(self.run_workers('--stats'))
+        self.assertEqual(stats['cache']['queued'], 2)
+        self.assertIn('oldest_s', stats['cache'])
+
+
+class ThreadPoolWorkersTest(TransactionTestCase):
+    def test_thread_pool_runs_all_jobs(self):
+        JOB_CALLS.clear()
+        for number in range(10):
+            enqueue(record_job, number)
+        enqueue(failing_job, max_attempts=1)
+        out = StringIO()
+        call_command('run_workers', '--burst', '--concurrency', '3',
+                     stdout=out)
+        self.assertEqual(sorted(JOB_CALLS), sorted(map(str, range(10))))
+        self.assertIn('default: выполнено 10, отложено 0, отброшено 1',
+                      out.getvalue())
+        self.assertEqual(Job.objects.filter(status=Job.DEAD).count(), 1)
@@ -0,0 +1,94 @@
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from smtplib import SMTPException
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.mail import get_connection, send_mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from core.models import OutgoingEmail
+
+User = get_user_model()
+
+
+@override_settings(
+    EMAIL_BACKEND='core.mail.SpoolBackend',
+    MAIL_SPOOL_BACKEND='django.core.mail.backends.filebased.EmailBackend',
+)
+class SendQueuedMailCommandTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.mail_dir = directory.name
+        mail_settings = override_settings(EMAIL_FILE_PATH=self.mail_dir)
+        mail_settings.enable()
+        self.addCleanup(mail_settings.disable)
+        User.objects.create_user(username='reader', email='reader@example.com',
+                                 password='password')
+
+    def sent_files(self):
+        files = []
+        for name in os.listdir(self.mail_dir):
+            with open(os.path.join(self.mail_dir, name), 'rb') as sent:
+                files.append(sent.read())
+        return files
+
+    def test_password_reset_is_spooled_and_sent_later(self):
+        self.client.post(reverse('users:password_reset_form'),
+                         {'email': 'reader@example.com'})
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(self.sent_files(), [])
+        outgoing = OutgoingEmail.objects.get()
+        self.assertEqual(outgoing.recipients, 'reader@example.com')
+        self.assertIsNone(outgoing.sent)
+
+        call_command('send_queued_mail', stdout=StringIO())
+        [sent] = self.sent_files()
+        self.assertIn(b'To: reader@example.com', sent)
+        outgoing.refresh_from_db()
+        self.assertIsNotNone(outgoing.sent)
+
+    def test_batch_reuses_one_connection(self):
+        for number in range(3):
+            send_mail('Тема', 'Текст', None, [f'user{number}@example.com'])
+        with mock.patch('core.mail.get_connection',
+                        wraps=get_connection) as connections:
+            call_command('send_queued_mail', batch_size=2, stdout=StringIO())
+        # Две пачки — два соединения на три письма.
+        self.assertEqual(connections.call_count, 2)
+        self.assertEqual(
+            sum(sent.count(b'Subject:') for sent in self.sent_files()), 3)
+        self.assertFalse(OutgoingEmail.objects.filter(sent=None).exists())
+
+    def test_failed_message_is_retried_with_backoff(self):
+        send_mail('Тема', 'Текст', None, ['reader@example.com'])
+        with mock.patch(
+            'django.core.mail.backends.filebased.EmailBackend.send_messages',
+            side_effect=SMTPException('сервер недоступен'),
+        ):
+            call_command('send_queued_mail', stdout=StringIO())
+            outgoing = OutgoingEmail.objects.get()
+            self.assertEqual(outgoing.attempts, 1)
+            self.assertIn('сервер недоступен', outgoing.last_error)
+            self.assertGreater(outgoing.next_attempt, timezone.now())
+            # Пауза удваивается с каждой неудачей.
+            OutgoingEmail.objects.update(next_attempt=timezone.now())
+            call_command('send_queued_mail', stdout=StringIO())
+            outgoing.refresh_from_db()
+            self.assertEqual(outgoing.attempts, 2)
+            self.assertGreater(
+                outgoing.next_attempt - timezone.now(),
+                timedelta(seconds=settings.MAIL_RETRY_DELAY * 1.5))
+        self.assertEqual(b''.join(self.sent_files()), b'')
+
+        OutgoingEmail.objects.update(next_attempt=timezone.now())
+        call_command('send_queued_mail', stdout=StringIO())
+        self.assertIn(b'To: reader@example.com', b''.join(self.sent_files()))
@@ -0,0 +1,115 @@
+import gzip
+import zlib
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+
+from core.middleware import (CompressionMiddleware, RepeatedQueriesError,
+                             SQLInstrumentationMiddleware)
+from posts import settings as posts_settings
+from posts.models import Group, Post
+
+from .mixins import PostsFixtureMixin
+
+User = get_user_model()
+
+
+@override_settings(SQL_REPEAT_RAISE=True, SQL_REPEAT_LIMIT=3)
+class SQLInstrumentationTestCase(PostsFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for number in range(posts_settings.POSTS_PER_PAGE):
+            author = User.objects.create_user(username=f'author-{number}')
+            group = Group.objects.create(title=f'Группа {number}',
+                                         slug=f'group-{number}')
+            Post.objects.create(text=f'Тестовый текст {number}',
+                                author=author, group=group)
+
+    def test_pages_have_no_repeated_queries(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'test-username'}),
+            reverse('posts:post_details', kwargs={'post_id': self.post.id}),
+            reverse('posts:post_update', kwargs={'post_id': self.post.id}),
+            reverse('posts:post_create'),
+            reverse('posts:search') + '?q=текст',
+            reverse('posts:api_index'),
+        )
+        for client in (self.client, self.authorized_client):
+            for url in urls:
+                with self.subTest(url=url):
+                    response = client.get(url)
+                    self.assertIn('sql;dur=', response['Server-Timing'])
+
+    def test_repeated_queries_fail(self):
+        def n_plus_one(request):
+            for post in Post.objects.all():
+                post.author
+            return HttpResponse()
+
+        middleware = SQLInstrumentationMiddleware(n_plus_one)
+        with self.assertLogs('core.middleware', 'WARNING'):
+            with self.assertRaises(RepeatedQueriesError):
+                middleware(RequestFactory().get('/'))
+
+
+class CompressionTestCase(PostsFixtureMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Post.objects.bulk_create(
+            Post(text=f'Тестовый текст поста {number}',
+                 author=cls.test_author)
+            for number in range(posts_settings.POSTS_PER_PAGE))
+        cls.url_index = reverse('posts:index')
+
+    def test_html_is_compressed_by_accept_encoding(self):
+        plain = self.client.get(self.url_index)
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertIn('Accept-Encoding', plain['Vary'])
+        for encoding, decompress in (('gzip', gzip.decompress),
+                                     ('deflate', zlib.decompress)):
+            response = self.client.get(
+                self.url_index, HTTP_ACCEPT_ENCODING=f'{encoding}, br')
+            self.assertEqual(response['Content-Encoding'], encoding)
+            self.assertEqual(int(response['Content-Length']),
+                             len(response.content))
+            self.assertEqual(decompress(response.content), plain.content)
+            self.assertTrue(response['ETag'].startswith('W/"'))
+
+    def test_small_body_is_not_compressed(self):
+        middleware = CompressionMiddleware(
+            lambda request: HttpResponse('Коротко'))
+        response = middleware(RequestFactory().get(
+            '/', HTTP_ACCEPT_ENCODING='gzip'))
+        self.assertNotIn('Content-Encoding', response)
+        self.assertEqual(response.content.decode(), 'Коротко')
+
+    def test_streaming_response_is_compressed_incrementally(self):
+        plain = self.client.get(reverse('posts:index_feed'))
+        response = self.client.get(reverse('posts:index_feed'),
+                                   HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertNotIn('Content-Length', response)
+        chunks = list(response.streaming_content)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(gzip.decompress(b''.join(chunks)),
+                         b''.join(plain.streaming_content))
+
+    def test_cached_page_is_not_compressed_again(self):
+        first = self.client.get(self.url_index, HTTP_ACCEPT_ENCODING='gzip')
+        with mock.patch('core.middleware.compress_bytes') as compress:
+            response = self.client.get(self.url_index,
+                                       HTTP_ACCEPT_ENCODING='gzip')
+        compress.assert_not_called()
+        self.assertEqual(response.content, first.content)
+        Post.objects.first().save()
+        with mock.patch('core.middleware.compress_bytes',
+                        return_value=b'new') as compress:
+            self.client.get(self.url_index, HTTP_ACCEPT_ENCODING='gzip')
+        compress.assert_called_once()
@@ -0,0 +1,107 @@
+import time
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import resolve, reverse
+
+from core.models import RateLimitBucket
+from core.ratelimit import limiter, purge_buckets, take
+from posts.models import Post
+from yatube import settings as project_settings
+
+from .mixins import PostsFixtureMixin
+
+User = get_user_model()
+
+
+@override_settings(RATE_LIMITS={
+    'users:login': {'methods': ('POST',), 'limits': ('ip:2/m',)},
+    'posts:post_create': {
+        'methods': ('POST',),
+        'limits': ('user:1/h', 'route:3/h'),
+    },
+    'posts:post_update': {'methods': ('POST',), 'limits': ('user:1/h',)},
+})
+class RateLimitTestCase(PostsFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        limiter.clear()
+        self.url_login = reverse('users:login')
+        self.credentials = {'username': 'nobody', 'password': 'wrong'}
+
+    def test_login_is_limited_per_ip(self):
+        for _ in range(2):
+            response = self.client.post(self.url_login, self.credentials)
+            self.assertEqual(response.status_code, HTTPStatus.OK)
+        with self.assertNumQueries(0):
+            response = self.client.post(self.url_login, self.credentials)
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '30')
+        self.assertEqual(self.client.get(self.url_login).status_code,
+                         HTTPStatus.OK)
+        response = self.client.post(self.url_login, self.credentials,
+                                    REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_exhausted_bucket_survives_cache_eviction(self):
+        """Вёдра лежат в базе: сброс кэша их не наполняет, а процесс без
+        своей копии ведра берёт состояние оттуда."""
+        for _ in range(2):
+            self.client.post(self.url_login, self.credentials)
+        cache.clear()
+        limiter.clear()
+        response = self.client.post(self.url_login, self.credentials)
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+
+    def test_full_buckets_are_purged(self):
+        self.client.post(self.url_login, self.credentials)
+        self.assertEqual(purge_buckets(), 0)
+        self.assertEqual(purge_buckets(time.time() + 60), 1)
+        self.assertFalse(RateLimitBucket.objects.exists())
+
+    def test_post_create_is_limited_per_user_and_route(self):
+        url = reverse('posts:post_create')
+        clients = []
+        for number in range(4):
+            client = Client()
+            client.force_login(User.objects.create_user(f'author{number}'))
+            clients.append(client)
+        statuses = [client.post(url, {'text': 'Текст поста'}).status_code
+                    for client in clients[:2]]
+        self.assertEqual(statuses, [HTTPStatus.FOUND] * 2)
+        response = clients[0].post(url, {'text': 'Текст поста'})
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.assertEqual(response['Retry-After'], '3600')
+        statuses = [client.post(url, {'text': 'Текст поста'}).status_code
+                    for client in clients[2:]]
+        self.assertEqual(statuses, [HTTPStatus.FOUND,
+                                    HTTPStatus.TOO_MANY_REQUESTS])
+        self.assertEqual(Post.objects.count(), 4)
+
+    def test_post_edit_is_limited(self):
+        url = reverse('posts:post_update', kwargs={'post_id': self.post.pk})
+        response = self.authorized_client.post(url, {'text': 'Новый текст'})
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+        response = self.authorized_client.post(url, {'text': 'Ещё текст'})
+        self.assertEqual(response.status_code, HTTPStatus.TOO_MANY_REQUESTS)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'Новый текст')
+
+    def test_project_limits_name_existing_routes(self):
+        urls = ('/create/', '/posts/1/edit/', '/posts/1/delete/',
+                '/auth/login/', '/auth/signup/', '/auth/password_reset/')
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertIn(resolve(url).view_name,
+                              project_settings.RATE_LIMITS)
+
+    def test_bucket_refills_over_period(self):
+        state, wait = take(None, 2, 60, now=0)
+        state, wait = take(state, 2, 60, now=0)
+        self.assertEqual((state, wait), ((0, 0), 0))
+        state, wait = take(state, 2, 60, now=15)
+        self.assertEqual(wait, 15)
+        state, wait = take(state, 2, 60, now=30)
+        self.assertEqual((state, wait), ((0, 30), 0))
@@ -0,0 +1,75 @@
+import os
+import sqlite3
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+
+from core.routers import (PrimaryReplicaRouter, read_database,
+                          replica_snapshot_time, use_primary_if_stale)
+from posts.models import Post
+
+from .mixins import PostsFixtureMixin
+
+User = get_user_model()
+
+
+class ReplicaRoutingTestCase(PostsFixtureMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.router = PrimaryReplicaRouter()
+
+    def test_feeds_are_read_from_replica_until_write(self):
+        profile = reverse('posts:profile',
+                          kwargs={'username': 'test-username'})
+        with mock.patch('core.middleware.use_replica') as use_replica:
+            self.authorized_client.get(profile)
+            self.assertEqual(use_replica.call_count, 1)
+            self.authorized_client.get(reverse('posts:post_create'))
+            self.assertEqual(use_replica.call_count, 1)
+            response = self.authorized_client.post(
+                reverse('posts:post_create'), {'text': 'Новая публикация'})
+            self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+            self.authorized_client.get(profile)
+            self.assertEqual(use_replica.call_count, 1)
+
+    def test_router(self):
+        token = read_database.set('replica')
+        self.addCleanup(read_database.reset, token)
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+        self.assertEqual(self.router.db_for_read(User), 'default')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        changed = self.post.updated
+        with mock.patch('core.routers.replica_snapshot_time',
+                        return_value=changed.timestamp() + 1):
+            use_primary_if_stale(changed)
+            self.assertEqual(self.router.db_for_read(Post), 'replica')
+        with mock.patch('core.routers.replica_snapshot_time',
+                        return_value=changed.timestamp() - 1):
+            use_primary_if_stale(changed)
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+
+
+class RefreshReplicaTestCase(TransactionTestCase):
+    # Снимок через backup API видит только зафиксированные данные, поэтому
+    # без обёртки TestCase в транзакцию.
+    def test_refresh_replica(self):
+        Post.objects.create(
+            text='Тестовый текст',
+            author=User.objects.create_user(username='test-username'),
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'replica.sqlite3')
+            with mock.patch.dict(settings.DATABASES['replica'], NAME=path):
+                call_command('refresh_replica', stdout=StringIO())
+                self.assertIsNotNone(replica_snapshot_time())
+            replica = sqlite3.connect(path)
+            self.addCleanup(replica.close)
+            self.assertEqual(replica.execute(
+                'SELECT text FROM posts_post').fetchall(),
+                [('Тестовый текст',)])
@@ -0,0 +1,66 @@
+import gzip
+import os
+import tempfile
+from http import HTTPStatus
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+class StaticFilesTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.static_root = tempfile.TemporaryDirectory()
+        cls.static_settings = override_settings(
+            STATIC_ROOT=cls.static_root.name)
+        cls.static_settings.enable()
+        call_command('collectstatic', interactive=False, verbosity=0)
+        cls.css = staticfiles_storage.stored_name('css/bootstrap.min.css')
+        cls.url_css = settings.STATIC_URL + cls.css
+        with open(os.path.join(settings.STATICFILES_DIRS[0], 'css',
+                               'bootstrap.min.css'), 'rb') as css:
+            cls.css_content = css.read()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.static_settings.disable()
+        cls.static_root.cleanup()
+        super().tearDownClass()
+
+    def test_templates_link_hashed_names(self):
+        self.assertRegex(self.css, r'^css/bootstrap\.min\.[0-9a-f]{12}\.css$')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, self.url_css)
+
+    def test_precompressed_variant_is_served(self):
+        response = self.client.get(self.url_css,
+                                   HTTP_ACCEPT_ENCODING='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Cache-Control'],
+                         'public, max-age=31536000, immutable')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)),
+            self.css_content)
+        self.assertNotIn('Server-Timing', response)
+
+    def test_identity_when_gzip_not_accepted(self):
+        for accept_encoding in ('', 'gzip;q=0, identity'):
+            response = self.client.get(
+                self.url_css, HTTP_ACCEPT_ENCODING=accept_encoding)
+            self.assertNotIn('Content-Encoding', response)
+            self.assertEqual(b''.join(response.streaming_content),
+                             self.css_content)
+
+    def test_original_name_is_revalidated(self):
+        url = settings.STATIC_URL + 'css/bootstrap.min.css'
+        response = self.client.get(url)
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
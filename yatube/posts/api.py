@@ -0,0 +1,123 @@
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from . import settings
+from .models import Group, Post, User
+from .page_cache import (conditional_page, group_scopes, index_scopes,
+                         post_scopes, profile_scopes)
+from .utils import FORWARD, CursorPaginator, decode_cursor, encode_cursor
+
+
+# Имя поля в ответе API и путь к нему для .values().
+API_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'updated': 'updated',
+    'author': 'author__username',
+    'group': 'group__slug',
+}
+DEFAULT_FIELDS = ('id', 'text', 'pub_date', 'author', 'group')
+# Без них не построить курсор на следующую страницу.
+CURSOR_FIELDS = ('id', 'pub_date')
+
+
+class ApiError(Exception):
+    pass
+
+
+def error_response(message, status=400):
+    return JsonResponse({'error': message}, status=status)
+
+
+def requested_fields(request):
+    fields = request.GET.get('fields')
+    if not fields:
+        return DEFAULT_FIELDS
+    fields = tuple(dict.fromkeys(
+        field.strip() for field in fields.split(',') if field.strip()))
+    unknown = set(fields) - set(API_FIELDS)
+    if unknown:
+        raise ApiError(f'Неизвестные поля: {", ".join(sorted(unknown))}.')
+    return fields
+
+
+def requested_limit(request):
+    limit = request.GET.get('limit', str(settings.POSTS_PER_PAGE))
+    if not limit.isdigit() or not 0 < int(limit) <= settings.POSTS_API_LIMIT:
+        raise ApiError(
+            f'limit должен быть от 1 до {settings.POSTS_API_LIMIT}.')
+    return int(limit)
+
+
+def serialize(row, fields):
+    return {field: row[API_FIELDS[field]] for field in fields}
+
+
+def posts_response(request, posts):
+    """Страница ленты по курсору: только нужные столбцы через .values(),
+    без COUNT и OFFSET."""
+    try:
+        fields = requested_fields(request)
+        limit = requested_limit(request)
+    except ApiError as error:
+        return error_response(str(error))
+    columns = {API_FIELDS[field] for field in fields + CURSOR_FIELDS}
+    paginator = CursorPaginator(posts.values(*columns), limit)
+    key = (None, None)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        decoded = decode_cursor(cursor)
+        if decoded is None or decoded[0] != FORWARD:
+            return error_response('Неверный курсор.')
+        key = decoded[1:]
+    rows, has_more = paginator.keyset_slice(FORWARD, *key)
+    next_url = None
+    if has_more:
+        params = {
+            name: request.GET[name] for name in ('fields', 'limit')
+            if name in request.GET
+        }
+        params['cursor'] = encode_cursor(FORWARD, rows[-1])
+        next_url = request.build_absolute_uri(
+            f'{request.path}?{urlencode(params)}')
+    return JsonResponse(
+        {'results': [serialize(row, fields) for row in rows],
+         'next': next_url},
+        json_dumps_params={'ensure_ascii': False},
+    )
+
+
+@conditional_page(index_scopes)
+def index(request):
+    return posts_response(request, Post.objects.all())
+
+
+@conditional_page(group_scopes)
+def group(request, slug):
+    group = get_object_or_404(Group.objects.only('pk'), slug=slug)
+    return posts_response(request, Post.objects.filter(group=group))
+
+
+@conditional_page(profile_scopes)
+def profile(request, username):
+    author = get_object_or_404(User.objects.only('pk'), username=username)
+    return posts_response(request, Post.objects.filter(author=author))
+
+
+@conditional_page(post_scopes)
+def post_detail(request, post_id):
+    try:
+        fields = requested_fields(request)
+    except ApiError as error:
+        return error_response(str(error))
+    row = Post.objects.filter(pk=post_id).values(
+        *{API_FIELDS[field] for field in fields}).first()
+    if row is None:
+        return error_response('Публикация не найдена.', status=404)
+    data = serialize(row, fields)
+    data['url'] = request.build_absolute_uri(
+        reverse('posts:post_details', args=(post_id,)))
+    return JsonResponse(data, json_dumps_params={'ensure_ascii': False})
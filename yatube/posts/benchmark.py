@@ -0,0 +1,260 @@
+import platform
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+import django
+from django.contrib.auth.tokens import default_token_generator
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+
+from core.cache import temporary_cache
+from core.stats import percentile
+
+from . import settings
+from .models import Group, Post, User
+from .seed import seed_posts
+from .utils import BACKWARD, FORWARD, encode_cursor
+
+
+# url и client — значение или функция без аргументов; функции вызываются
+# перед каждым замером и в измеряемое время не входят.
+Route = namedtuple('Route', 'name variant url client')
+
+BENCHMARK_STAFF = 'benchmark-staff'
+PERCENTILES = (50, 90, 99)
+
+
+@contextmanager
+def benchmark_database(name):
+    """Подключает отдельную файловую базу name (создаёт и мигрирует её при
+    необходимости) и временный кэш, чтобы замеры не трогали рабочие
+    данные и кэш сайта. Файл базы остаётся и переиспользуется следующими
+    прогонами."""
+    old_name = connection.settings_dict['NAME']
+    old_test_name = connection.settings_dict['TEST']['NAME']
+    connection.settings_dict['TEST']['NAME'] = name
+    try:
+        with temporary_cache():
+            connection.creation.create_test_db(
+                verbosity=0, autoclobber=True, serialize=False, keepdb=True)
+            try:
+                yield
+            finally:
+                connection.creation.destroy_test_db(
+                    old_name, verbosity=0, keepdb=True)
+    finally:
+        connection.settings_dict['TEST']['NAME'] = old_test_name
+
+
+def ensure_dataset(posts, authors=None, groups=None, seed=0):
+    """Генерирует набор из posts постов, если в базе другое их число.
+    Возвращает True, если данные пришлось создавать. Прежние посты
+    удаляются в seed_posts одним DELETE: через ORM каждый из миллиона
+    постов загружался бы и проходил сигналы post_delete."""
+    if Post.objects.count() == posts:
+        return False
+    seed_posts(posts, authors or max(10, posts // 100),
+               groups or max(5, posts // 2000), seed=seed, replace=True)
+    return True
+
+
+def busiest(field):
+    """pk автора или группы с наибольшим числом постов."""
+    return Post.objects.exclude(**{field: None}).order_by().values(
+        field).annotate(total=Count('id')).order_by(
+            '-total', field).values_list(field, flat=True).first()
+
+
+def logged_in(user):
+    def client():
+        client = Client()
+        client.force_login(user)
+        return client
+    return client
+
+
+def page_variants(name, kwargs, count):
+    """Первая и последняя нумерованные страницы (самый большой OFFSET) и
+    последняя страница ленты по курсору."""
+    url = reverse(name, kwargs=kwargs)
+    last = max(1, min(-(-count // settings.POSTS_PER_PAGE),
+                      settings.POSTS_NUMBERED_PAGES))
+    return [
+        ('page=1', f'{url}?page=1'),
+        ('page=last_numbered', f'{url}?page={last}'),
+        ('cursor=last', f'{url}?cursor={encode_cursor(BACKWARD)}'),
+    ]
+
+
+def middle_cursor(posts):
+    post = posts.order_by('-pub_date', '-id')[posts.count() // 2]
+    return encode_cursor(FORWARD, post)
+
+
+def build_routes():
+    """Все адреса posts.urls, users.urls и about с неглубокими и
+    глубокими страницами лент."""
+    author = User.objects.get(pk=busiest('author'))
+    group = Group.objects.get(pk=busiest('group'))
+    post = Post.objects.filter(author=author).latest('id')
+    staff, _ = User.objects.get_or_create(
+        username=BENCHMARK_STAFF, defaults={'is_staff': True})
+    guest, as_author, as_staff = Client(), logged_in(author)(), \
+        logged_in(staff)()
+    feeds = (
+        ('posts:index', {}, Post.objects.all(), guest),
+        ('posts:group', {'slug': group.slug}, group.posts.all(), guest),
+        ('posts:profile', {'username': author.username},
+         author.posts.all(), guest),
+    )
+    routes = []
+    for name, kwargs, posts, client in feeds:
+        count = posts.count()
+        for variant, url in page_variants(name, kwargs, count):
+            routes.append(Route(name, variant, url, client))
+        routes.append(Route(
+            name, 'cursor=middle',
+            f'{reverse(name, kwargs=kwargs)}?cursor={middle_cursor(posts)}',
+            client,
+        ))
+        routes.append(Route(f'{name}_feed', '',
+                            reverse(f'{name}_feed', kwargs=kwargs), client))
+    api_feeds = (
+        ('posts:api_index', {}, Post.objects.all()),
+        ('posts:api_group', {'slug': group.slug}, group.posts.all()),
+        ('posts:api_profile', {'username': author.username},
+         author.posts.all()),
+    )
+    for name, kwargs, posts in api_feeds:
+        url = reverse(name, kwargs=kwargs)
+        routes.append(Route(name, '', url, guest))
+        routes.append(Route(name, 'cursor=middle',
+                            f'{url}?cursor={middle_cursor(posts)}', guest))
+
+    def deletable_post():
+        doomed = Post.objects.create(text='Пост для удаления', author=staff)
+        return reverse('posts:post_delete', kwargs={'post_id': doomed.pk})
+
+    uid = urlsafe_base64_encode(force_bytes(staff.pk))
+    token = default_token_generator.make_token(staff)
+    routes += [
+        Route('posts:post_details', '',
+              reverse('posts:post_details', kwargs={'post_id': post.pk}),
+              guest),
+        Route('posts:api_post', '',
+              reverse('posts:api_post', kwargs={'post_id': post.pk}), guest),
+        Route('posts:post_update', '',
+              reverse('posts:post_update', kwargs={'post_id': post.pk}),
+              as_author),
+        Route('posts:post_create', '', reverse('posts:post_create'),
+              as_author),
+        Route('posts:post_delete', '', deletable_post, as_staff),
+        Route('posts:search', '', reverse('posts:search') + '?q=текст',
+              guest),
+        Route('posts:export', '',
+              reverse('posts:export', kwargs={'table': 'groups'}), as_staff),
+        Route('users:signup', '', reverse('users:signup'), guest),
+        Route('users:login', '', reverse('users:login'), guest),
+        Route('users:logout', '', reverse('users:logout'),
+              logged_in(staff)),
+        Route('users:password_change_form', '',
+              reverse('users:password_change_form'), as_author),
+        Route('users:password_change_done', '',
+              reverse('users:password_change_done'), as_author),
+        Route('users:password_reset_form', '',
+              reverse('users:password_reset_form'), guest),
+        Route('users:password_reset_done', '',
+              reverse('users:password_reset_done'), as_author),
+        Route('users:password_reset_confirm', '',
+              reverse('users:password_reset_confirm',
+                      kwargs={'uidb64': uid, 'token': token}), guest),
+        Route('users:password_reset_complete', '',
+              reverse('users:password_reset_complete'), as_author),
+        Route('about:author', '', reverse('about:author'), guest),
+        Route('about:tech', '', reverse('about:tech'), guest),
+    ]
+    return routes
+
+
+def route_key(route):
+    return f'{route.name} {route.variant}' if route.variant else route.name
+
+
+def measure(route, repeats, cold=False):
+    """Замеряет repeats запросов после одного прогревочного. Для потоковых
+    ответов в замер входит чтение всего тела. cold сбрасывает кэш перед
+    каждым запросом."""
+    timings = []
+    for attempt in range(repeats + 1):
+        url = route.url() if callable(route.url) else route.url
+        client = route.client() if callable(route.client) else route.client
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                body = b''.join(response.streaming_content)
+            else:
+                body = response.content
+            elapsed = time.perf_counter() - started
+        if attempt:
+            timings.append(elapsed * 1000)
+    result = {
+        'url': url,
+        'status': response.status_code,
+        'queries': len(queries),
+        'bytes': len(body),
+        'mean_ms': round(sum(timings) / len(timings), 3),
+    }
+    for percent in PERCENTILES:
+        result[f'p{percent}_ms'] = round(percentile(timings, percent), 3)
+    return result
+
+
+def run_benchmark(repeats=20, cold=False, only=None, meta=None):
+    """Результаты по всем адресам в виде, пригодном для JSON: meta с
+    параметрами прогона и routes с замерами по ключу «имя вариант»."""
+    results = {}
+    for route in build_routes():
+        key = route_key(route)
+        if only and not any(part in key for part in only):
+            continue
+        results[key] = measure(route, repeats, cold)
+    return {
+        'meta': {
+            'posts': Post.objects.count(),
+            'authors': User.objects.count(),
+            'groups': Group.objects.count(),
+            'repeats': repeats,
+            'cold': cold,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            **(meta or {}),
+        },
+        'routes': results,
+    }
+
+
+def compare(current, baseline, threshold=0.2):
+    """Регрессии current относительно baseline: медиана выросла больше
+    чем на threshold или запросов к базе стало больше."""
+    regressions = []
+    for key, result in current['routes'].items():
+        old = baseline['routes'].get(key)
+        if old is None:
+            continue
+        if result['p50_ms'] > old['p50_ms'] * (1 + threshold):
+            regressions.append(
+                f'{key}: p50 {old["p50_ms"]} -> {result["p50_ms"]} мс')
+        if result['queries'] > old['queries']:
+            regressions.append(
+                f'{key}: запросов {old["queries"]} -> {result["queries"]}')
+    return regressions
@@ -0,0 +1,102 @@
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import AuthorStats, Post
+from .page_cache import invalidate_scopes
+from .utils import count_posts_by_author, posts_count_key
+
+
+def insert_rows(model, fields, rows, ignore_conflicts=False):
+    """Вставляет кортежи значений полей fields одним executemany, без
+    создания объектов модели. Даты приводятся к формату базы."""
+    fields = [model._meta.get_field(name) for name in fields]
+    prepare = [
+        field.get_db_prep_save if field.get_internal_type() == 'DateTimeField'
+        else None for field in fields
+    ]
+    columns = ', '.join(connection.ops.quote_name(field.column)
+                        for field in fields)
+    sql = (
+        f'{connection.ops.insert_statement(ignore_conflicts)} '
+        f'{connection.ops.quote_name(model._meta.db_table)} ({columns}) '
+        f'VALUES ({", ".join(["%s"] * len(fields))})'
+    )
+    rows = [
+        [value if prep is None else prep(value, connection)
+         for value, prep in zip(row, prepare)]
+        for row in rows
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+POST_COLUMNS = ('text', 'pub_date', 'updated', 'author', 'group', 'image',
+                'thumbnails')
+
+
+def bulk_insert_posts(posts, checkpoint=None):
+    """Вставляет посты одной транзакцией и делает то, что при обычном
+    save() делают сигналы: счётчики авторов и сброс кэшей лент.
+    Индекс поиска обновляется триггерами FTS5. checkpoint, если передан,
+    вызывается в той же транзакции: контрольная точка импорта фиксируется
+    вместе с постами.
+
+    Вставка идёт через insert_rows, а не bulk_create: pre_save с
+    auto_now_add затёр бы переданные pub_date."""
+    authors = Counter(post.author_id for post in posts)
+    groups = {post.group_id for post in posts} - {None}
+    now = timezone.now()
+    rows = [
+        (post.text, post.pub_date or now, now, post.author_id,
+         post.group_id, post.image.name or '', post.thumbnails)
+        for post in posts
+    ]
+    with transaction.atomic():
+        insert_rows(Post, POST_COLUMNS, rows)
+        add_author_posts_counts(authors)
+        if checkpoint is not None:
+            checkpoint()
+    cache.delete_many([
+        posts_count_key('all'),
+        *(posts_count_key('author', pk) for pk in authors),
+        *(posts_count_key('group', pk) for pk in groups),
+    ])
+    invalidate_scopes(
+        'index',
+        *(f'author:{pk}' for pk in authors),
+        *(f'group:{pk}' for pk in groups),
+    )
+
+
+def add_author_posts_counts(counts):
+    """Прибавляет к хранимым счётчикам авторов {author_id: число постов}."""
+    existing = set(AuthorStats.objects.filter(
+        author_id__in=counts).values_list('author_id', flat=True))
+    for author_id, total in counts.items():
+        if author_id in existing:
+            AuthorStats.objects.filter(author_id=author_id).update(
+                posts_count=F('posts_count') + total)
+    missing = [author_id for author_id in counts if author_id not in existing]
+    if missing:
+        actual = Post.objects.filter(author_id__in=missing).order_by()
+        actual = dict(actual.values('author').annotate(
+            total=Count('id')).values_list('author', 'total'))
+        AuthorStats.objects.bulk_create([
+            AuthorStats(author_id=author_id, posts_count=actual[author_id])
+            for author_id in missing
+        ], ignore_conflicts=True)
+
+
+def rebuild_author_stats():
+    """Заново строит все счётчики авторов по фактическому числу постов.
+    Быстрее поштучных обновлений после загрузки миллионов постов."""
+    with transaction.atomic():
+        AuthorStats.objects.all().delete()
+        AuthorStats.objects.bulk_create([
+            AuthorStats(author_id=author_id, posts_count=total)
+            for author_id, total in count_posts_by_author().items()
+        ])
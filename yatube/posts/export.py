@@ -0,0 +1,116 @@
+import csv
+import io
+import json
+import zlib
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Group, Post, User
+
+
+# Таблица: (модель, выгружаемые поля, поле даты для инкрементной выгрузки).
+EXPORTS = {
+    'posts': (
+        Post,
+        ('id', 'text', 'pub_date', 'updated', 'author_id', 'group_id'),
+        'pub_date',
+    ),
+    'groups': (Group, ('id', 'title', 'slug', 'description'), None),
+    'authors': (
+        User,
+        ('id', 'username', 'first_name', 'last_name', 'date_joined'),
+        'date_joined',
+    ),
+}
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+FORMATS = tuple(CONTENT_TYPES)
+
+
+def parse_since_date(value):
+    """Дата ISO 8601 для выгрузки по дате, без зоны — UTC. None, если
+    строка не дата или такой даты нет (2020-13-01)."""
+    try:
+        since_date = parse_datetime(value)
+    except ValueError:
+        return None
+    if since_date is not None and timezone.is_naive(since_date):
+        since_date = timezone.make_aware(since_date, timezone.utc)
+    return since_date
+
+
+def iter_rows(table, since_id=None, since_date=None, chunk_size=2000):
+    """Строки таблицы в порядке первичного ключа. Каждая пачка — отдельный
+    запрос pk > последний выданный, поэтому в памяти не больше пачки."""
+    model, fields, date_field = EXPORTS[table]
+    rows = model.objects.order_by('pk')
+    if since_date is not None:
+        if date_field is None:
+            raise ValueError(f'Таблица {table} не поддерживает выгрузку '
+                             f'по дате.')
+        rows = rows.filter(**{f'{date_field}__gt': since_date})
+    last_id = since_id or 0
+    while True:
+        chunk = list(rows.filter(pk__gt=last_id).values(*fields)[:chunk_size])
+        if not chunk:
+            return
+        yield from chunk
+        last_id = chunk[-1]['id']
+
+
+def iter_lines(table, rows, export_format):
+    if export_format == 'jsonl':
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False, default=str) + '\n'
+        return
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORTS[table][1])
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_encoded(lines, compress=False, flush_size=64 * 1024):
+    """Кодирует строки в UTF-8 и при compress сжимает их в gzip на лету,
+    отдавая блоки примерно по flush_size байт."""
+    compressor = zlib.compressobj(wbits=31) if compress else None
+    pending = []
+    size = 0
+    for line in lines:
+        data = line.encode()
+        pending.append(data)
+        size += len(data)
+        if size >= flush_size:
+            block = b''.join(pending)
+            pending, size = [], 0
+            block = compressor.compress(block) if compressor else block
+            if block:
+                yield block
+    block = b''.join(pending)
+    if compressor:
+        yield compressor.compress(block) + compressor.flush()
+    elif block:
+        yield block
+
+
+def export(table, export_format='jsonl', compress=False, since_id=None,
+           since_date=None, chunk_size=2000, watermark=None):
+    """Поток байтов выгрузки. Если передан словарь watermark, в
+    watermark['id'] записывается id последней выгруженной строки."""
+    rows = iter_rows(table, since_id, since_date, chunk_size)
+    if watermark is not None:
+        rows = track_watermark(rows, watermark)
+    return iter_encoded(iter_lines(table, rows, export_format), compress)
+
+
+def track_watermark(rows, watermark):
+    for row in rows:
+        watermark['id'] = row['id']
+        yield row
@@ -0,0 +1,95 @@
+from xml.sax.saxutils import escape, quoteattr
+
+from django.urls import reverse
+from django.utils.http import http_date
+
+from . import settings
+
+
+ATOM_CONTENT_TYPE = 'application/atom+xml; charset=utf-8'
+RSS_CONTENT_TYPE = 'application/rss+xml; charset=utf-8'
+
+
+def feed_posts(posts):
+    """Посты ленты по одному из серверного курсора, без загрузки всей
+    выборки в память."""
+    posts = posts.select_related('author', 'group').only(
+        'text', 'pub_date', 'updated', 'author', 'group',
+        'author__username', 'author__first_name', 'author__last_name',
+        'group__title',
+    ).order_by('-pub_date', '-id')[:settings.POSTS_FEED_SIZE]
+    return posts.iterator(chunk_size=settings.POSTS_FEED_CHUNK_SIZE)
+
+
+def author_name(post):
+    return post.author.get_full_name() or post.author.username
+
+
+def atom_feed(request, title, posts, updated):
+    """Генератор Atom-документа по частям: заголовок, записи, хвост."""
+    self_url = request.build_absolute_uri()
+    yield (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<feed xmlns="http://www.w3.org/2005/Atom">'
+        f'<title>{escape(title)}</title>'
+        f'<link href={quoteattr(self_url)} rel="self"/>'
+        f'<id>{escape(self_url)}</id>'
+        f'<updated>{updated.isoformat()}</updated>'
+    )
+    for post in feed_posts(posts):
+        url = request.build_absolute_uri(
+            reverse('posts:post_details', args=(post.pk,)))
+        category = ''
+        if post.group_id is not None:
+            category = f'<category term={quoteattr(post.group.title)}/>'
+        yield (
+            '<entry>'
+            f'<title>{escape(str(post))}</title>'
+            f'<link href={quoteattr(url)} rel="alternate"/>'
+            f'<id>{escape(url)}</id>'
+            f'<published>{post.pub_date.isoformat()}</published>'
+            f'<updated>{post.updated.isoformat()}</updated>'
+            f'<author><name>{escape(author_name(post))}</name></author>'
+            f'{category}'
+            f'<content type="text">{escape(post.text)}</content>'
+            '</entry>'
+        )
+    yield '</feed>\n'
+
+
+def rss_feed(request, title, posts, updated):
+    """Генератор RSS 2.0 с той же выборкой, что и atom_feed."""
+    site_url = request.build_absolute_uri(reverse('posts:index'))
+    yield (
+        '<?xml version="1.0" encoding="utf-8"?>\n'
+        '<rss version="2.0"><channel>'
+        f'<title>{escape(title)}</title>'
+        f'<link>{escape(site_url)}</link>'
+        f'<description>{escape(title)}</description>'
+        f'<lastBuildDate>{http_date(updated.timestamp())}</lastBuildDate>'
+    )
+    for post in feed_posts(posts):
+        url = request.build_absolute_uri(
+            reverse('posts:post_details', args=(post.pk,)))
+        category = ''
+        if post.group_id is not None:
+            category = f'<category>{escape(post.group.title)}</category>'
+        yield (
+            '<item>'
+            f'<title>{escape(str(post))}</title>'
+            f'<link>{escape(url)}</link>'
+            f'<guid isPermaLink="true">{escape(url)}</guid>'
+            f'<pubDate>{http_date(post.pub_date.timestamp())}</pubDate>'
+            f'<dc:creator xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            f'{escape(author_name(post))}</dc:creator>'
+            f'{category}'
+            f'<description>{escape(post.text)}</description>'
+            '</item>'
+        )
+    yield '</channel></rss>\n'
+
+
+FEED_FORMATS = {
+    'atom': (atom_feed, ATOM_CONTENT_TYPE),
+    'rss': (rss_feed, RSS_CONTENT_TYPE),
+}
@@ -4,6 +4,12 @@ from .models import Post
 from . import settings
 
 
+def validate_text(data):
+    if len(data) < settings.TEXT_LENGTH_MINIMAL:
+        raise forms.ValidationError('Текст публикации не может быть короче'
+                                    ' 10 символов.')
+
+
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
@@ -18,7 +24,19 @@ class PostForm(forms.ModelForm):
 
     def clean_text(self):
         data = self.cleaned_data['text']
-        if len(data) < settings.TEXT_LENGTH_MINIMAL:
-            raise forms.ValidationError('Текст публикации не может быть короче'
-                                        ' 10 символов.')
+        validate_text(data)
         return data
+
+
+class PostImageForm(forms.ModelForm):
+    """Картинка поста — отдельной формой рядом с PostForm, в том же теге
+    <form>; обе формы работают с одним экземпляром поста."""
+
+    class Meta:
+        model = Post
+        fields = ('image',)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['image'].widget.attrs['class'] = 'form-control'
+        self.fields['image'].help_text = None
@@ -0,0 +1,263 @@
+import random
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from urllib.parse import urlencode, urlsplit
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings as django_settings
+from django.contrib.auth import (BACKEND_SESSION_KEY, HASH_SESSION_KEY,
+                                 SESSION_KEY)
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.signals import got_request_exception
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db.models import Max, Min
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from core.backends.sqlite3.base import STOCK_PRAGMAS
+from core.stats import percentile
+
+from . import settings
+from .models import Group, Post, User
+
+
+DEFAULT_MIX = {
+    'index': 40,
+    'group': 20,
+    'profile': 20,
+    'post_detail': 10,
+    'post_create': 5,
+    'post_edit': 5,
+}
+# Верхние границы корзин гистограммы задержек, мс.
+HISTOGRAM_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def parse_mix(mix):
+    """'index=40,post_create=5' -> {'index': 40, 'post_create': 5}."""
+    weights = {}
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in DEFAULT_MIX or not weight.strip().isdigit():
+            raise ValueError(f'Неверный элемент смеси: {part!r}.')
+        weights[name] = int(weight)
+    return weights
+
+
+@contextmanager
+def stock_sqlite():
+    """Временно переключает базу на стандартные PRAGMA SQLite, обычные
+    транзакции и соединение на каждый запрос — точку отсчёта для
+    сравнения с настройками из DATABASES."""
+    settings_dict = connections[DEFAULT_DB_ALIAS].settings_dict
+    saved = settings_dict['OPTIONS'], settings_dict['CONN_MAX_AGE']
+    connections.close_all()
+    settings_dict['OPTIONS'] = {'pragmas': STOCK_PRAGMAS}
+    settings_dict['CONN_MAX_AGE'] = 0
+    try:
+        yield
+    finally:
+        connections.close_all()
+        settings_dict['OPTIONS'], settings_dict['CONN_MAX_AGE'] = saved
+
+
+class Writer:
+    """Автор с готовой сессией, CSRF-токеном и своим постом для правки."""
+
+    def __init__(self, user, post_id):
+        session = SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = \
+            'django.contrib.auth.backends.ModelBackend'
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.create()
+        self.csrf_token = get_random_string(32)
+        self.cookie = (
+            f'{django_settings.SESSION_COOKIE_NAME}={session.session_key}; '
+            f'{django_settings.CSRF_COOKIE_NAME}={self.csrf_token}'
+        )
+        self.post_id = post_id
+
+
+class LoadTest:
+    """Нагрузка на WSGI-приложение внутри процесса из threads потоков.
+
+    Каждый поток — отдельный клиент со своим соединением с базой; запросы
+    выбираются случайно по весам mix. Ошибки «database is locked»
+    перехватываются сигналом got_request_exception и считаются отдельно
+    от прочих ответов 4xx/5xx."""
+
+    def __init__(self, application, mix=None, threads=8, writers=10,
+                 seed=0):
+        self.application = application
+        self.mix = mix or DEFAULT_MIX
+        self.threads = threads
+        self.seed = seed
+        self.local = threading.local()
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self.prepare(writers)
+
+    def prepare(self, writers):
+        self.group_slugs = list(Group.objects.values_list('slug', flat=True))
+        self.usernames = list(User.objects.filter(
+            posts__isnull=False).distinct().values_list(
+                'username', flat=True))
+        self.post_ids = Post.objects.aggregate(
+            first=Min('id'), last=Max('id'))
+        self.pages = max(1, min(settings.POSTS_NUMBERED_PAGES,
+                                Post.objects.count()
+                                // settings.POSTS_PER_PAGE))
+        users = User.objects.filter(
+            posts__isnull=False).distinct().order_by('pk')
+        self.writers = [
+            Writer(user, user.posts.values_list('id', flat=True).first())
+            for user in users[:writers]
+        ]
+        if not self.usernames or not self.writers:
+            raise ValueError('Нет постов для нагрузки: сгенерируйте данные.')
+
+    def request(self, rng, operation):
+        """(метод, путь, тело, автор или None) для операции."""
+        if operation == 'index':
+            return 'GET', f'/?page={rng.randint(1, self.pages)}', b'', None
+        if operation == 'group':
+            slug = rng.choice(self.group_slugs)
+            return 'GET', reverse('posts:group', args=(slug,)), b'', None
+        if operation == 'profile':
+            username = rng.choice(self.usernames)
+            return ('GET', reverse('posts:profile', args=(username,)), b'',
+                    None)
+        if operation == 'post_detail':
+            post_id = rng.randint(self.post_ids['first'],
+                                  self.post_ids['last'])
+            return ('GET', reverse('posts:post_details', args=(post_id,)),
+                    b'', None)
+        writer = rng.choice(self.writers)
+        text = f'Пост под нагрузкой {rng.random():.12f}'
+        body = urlencode({'text': text}).encode()
+        if operation == 'post_create':
+            path = reverse('posts:post_create')
+        else:
+            path = reverse('posts:post_update', args=(writer.post_id,))
+        return 'POST', path, body, writer
+
+    def call(self, method, path, body, writer):
+        url = urlsplit(path)
+        environ = {
+            'REQUEST_METHOD': method,
+            'PATH_INFO': url.path,
+            'QUERY_STRING': url.query,
+            'wsgi.input': BytesIO(body),
+            'CONTENT_LENGTH': str(len(body)),
+            'CONTENT_TYPE': 'application/x-www-form-urlencoded',
+            'wsgi.errors': sys.stderr,
+        }
+        if writer is not None:
+            environ['HTTP_COOKIE'] = writer.cookie
+            environ['HTTP_X_CSRFTOKEN'] = writer.csrf_token
+        setup_testing_defaults(environ)
+        status = []
+
+        def start_response(response_status, headers, exc_info=None):
+            status.append(int(response_status.split()[0]))
+
+        self.local.exception = None
+        response = self.application(environ, start_response)
+        try:
+            for _ in response:
+                pass
+        finally:
+            # close() шлёт request_finished и закрывает соединение с базой.
+            response.close()
+        return status[0]
+
+    def worker(self, number, deadline, requests):
+        rng = random.Random(self.seed + number)
+        operations = list(self.mix)
+        weights = [self.mix[operation] for operation in operations]
+        done = 0
+        try:
+            while time.monotonic() < deadline and (
+                    requests is None or done < requests):
+                operation = rng.choices(operations, weights)[0]
+                request = self.request(rng, operation)
+                started = time.perf_counter()
+                status = self.call(*request)
+                elapsed = (time.perf_counter() - started) * 1000
+                done += 1
+                with self.lock:
+                    self.latencies[operation].append(elapsed)
+                    if self.local.exception is not None:
+                        self.errors[operation][self.local.exception] += 1
+                    elif status >= 400:
+                        self.errors[operation][f'HTTP {status}'] += 1
+        finally:
+            connections.close_all()
+
+    def record_exception(self, sender, request=None, **kwargs):
+        error = sys.exc_info()[1]
+        if isinstance(error, OperationalError) and 'locked' in str(error):
+            self.local.exception = 'database is locked'
+        else:
+            self.local.exception = type(error).__name__
+
+    def run(self, duration=10.0, requests=None):
+        """Гоняет нагрузку duration секунд или по requests запросов на
+        поток и возвращает отчёт report()."""
+        got_request_exception.connect(self.record_exception)
+        started = time.monotonic()
+        try:
+            with ThreadPoolExecutor(self.threads) as pool:
+                futures = [
+                    pool.submit(self.worker, number, started + duration,
+                                requests)
+                    for number in range(self.threads)
+                ]
+                for future in futures:
+                    future.result()
+        finally:
+            got_request_exception.disconnect(self.record_exception)
+        return self.report(time.monotonic() - started)
+
+    def report(self, elapsed):
+        operations = {}
+        for operation, latencies in sorted(self.latencies.items()):
+            latencies.sort()
+            errors = dict(self.errors[operation])
+            histogram = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+            for latency in latencies:
+                histogram[bisect_left(HISTOGRAM_BUCKETS, latency)] += 1
+            operations[operation] = {
+                'requests': len(latencies),
+                'rps': round(len(latencies) / elapsed, 1),
+                'p50_ms': round(percentile(latencies, 50), 2),
+                'p90_ms': round(percentile(latencies, 90), 2),
+                'p99_ms': round(percentile(latencies, 99), 2),
+                'max_ms': round(latencies[-1], 2),
+                'errors': errors,
+                'locked_rate': round(
+                    errors.get('database is locked', 0) / len(latencies), 4),
+                'histogram': dict(zip(
+                    [f'<={bound}ms' for bound in HISTOGRAM_BUCKETS]
+                    + ['>5000ms'], histogram)),
+            }
+        total = sum(result['requests'] for result in operations.values())
+        locked = sum(result['errors'].get('database is locked', 0)
+                     for result in operations.values())
+        return {
+            'threads': self.threads,
+            'elapsed_s': round(elapsed, 2),
+            'requests': total,
+            'rps': round(total / elapsed, 1),
+            'locked_rate': round(locked / total, 4) if total else 0,
+            'operations': operations,
+        }
@@ -0,0 +1,110 @@
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.benchmark import (benchmark_database, compare, ensure_dataset,
+                             run_benchmark)
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку, число SQL-запросов и размер ответа для '
+            'всех адресов posts, users и about на сгенерированных данных '
+            'и сравнивает результат с сохранённым базовым.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts',
+            type=int,
+            default=1000,
+            help='Размер набора данных: 1000, 100000, 1000000...',
+        )
+        parser.add_argument(
+            '--authors',
+            type=int,
+            help='Число авторов; по умолчанию один на 100 постов.',
+        )
+        parser.add_argument(
+            '--groups',
+            type=int,
+            help='Число групп; по умолчанию одна на 2000 постов.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--repeats', type=int, default=20)
+        parser.add_argument(
+            '--cold',
+            action='store_true',
+            help='Сбрасывать кэш перед каждым запросом.',
+        )
+        parser.add_argument(
+            '--only',
+            nargs='+',
+            help='Мерить только адреса, в имени которых есть эти строки.',
+        )
+        parser.add_argument('--output', '-o', help='Файл для JSON.')
+        parser.add_argument('--baseline', help='JSON прошлого прогона.')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.2,
+            help='Допустимый рост медианы относительно базового прогона.',
+        )
+        parser.add_argument(
+            '--fail-on-regression',
+            action='store_true',
+            help='Завершаться с ошибкой, если найдены регрессии.',
+        )
+        parser.add_argument(
+            '--database',
+            default=os.path.join(settings.BASE_DIR, 'benchmark.sqlite3'),
+            help='Отдельная база для прогона; данные в ней сохраняются '
+                 'между запусками с теми же параметрами.',
+        )
+        parser.add_argument(
+            '--no-isolate',
+            action='store_true',
+            help='Мерить на текущей базе, не создавая отдельной.',
+        )
+
+    def handle(self, *args, **options):
+        if options['no_isolate']:
+            return self.run(options)
+        with benchmark_database(options['database']):
+            return self.run(options)
+
+    def run(self, options):
+        started = time.monotonic()
+        if ensure_dataset(options['posts'], options['authors'],
+                          options['groups'], options['seed']):
+            self.stdout.write(
+                f'Данные готовы за {time.monotonic() - started:.1f} с.')
+        result = run_benchmark(
+            options['repeats'], options['cold'], options['only'],
+            meta={'seed': options['seed']},
+        )
+        report = json.dumps(result, ensure_ascii=False, indent=2,
+                            sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(report + '\n')
+        else:
+            self.stdout.write(report)
+        for key, route in result['routes'].items():
+            self.stderr.write(
+                f'{key:<45} p50 {route["p50_ms"]:>8.2f} мс  '
+                f'p99 {route["p99_ms"]:>8.2f} мс  '
+                f'{route["queries"]:>3} запр.  {route["bytes"]:>8} байт'
+            )
+        if not options['baseline']:
+            return
+        with open(options['baseline'], encoding='utf-8') as baseline:
+            regressions = compare(result, json.load(baseline),
+                                  options['threshold'])
+        for regression in regressions:
+            self.stderr.write(self.style.WARNING(regression))
+        if regressions and options['fail_on_regression']:
+            raise CommandError(f'Регрессий: {len(regressions)}.')
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
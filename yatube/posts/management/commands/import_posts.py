@@ -0,0 +1,196 @@
+import csv
+import json
+import os
+import time
+from functools import partial
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from posts.bulk import bulk_insert_posts
+from posts.forms import validate_text
+from posts.models import Group, ImportCheckpoint, Post, User
+
+
+def read_jsonl(path):
+    with open(path, encoding='utf-8') as source:
+        for line in source:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Битая строка считается записью, чтобы номера записей
+                # и контрольная точка не сдвигались.
+                yield None
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8', newline='') as source:
+        yield from csv.DictReader(source)
+
+
+READERS = {
+    'jsonl': read_jsonl,
+    'csv': read_csv,
+}
+
+
+def string_field(record, name):
+    """Значение поля записи или ''. В JSONL в поле может оказаться число
+    или список, такая запись пропускается."""
+    value = record.get(name)
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise ValidationError(f'Поле {name} должно быть строкой.')
+    return value
+
+
+class Command(BaseCommand):
+    help = ('Потоковый импорт публикаций из JSONL или CSV с полями text, '
+            'author (username), group (slug) и pub_date.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Файл с публикациями.')
+        parser.add_argument(
+            '--format',
+            choices=READERS,
+            help='Формат файла; по умолчанию берётся из расширения.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Сколько записей вставлять в одной транзакции.',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='Имя контрольной точки в базе; по умолчанию полный путь '
+                 'к файлу.',
+        )
+        parser.add_argument(
+            '--create-authors',
+            action='store_true',
+            help='Создавать отсутствующих авторов без пароля.',
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        feed_format = options['format'] or os.path.splitext(path)[1][1:]
+        if feed_format not in READERS:
+            raise CommandError('Укажите --format: jsonl или csv.')
+        self.chunk_size = options['chunk_size']
+        self.create_authors = options['create_authors']
+        self.checkpoint = options['checkpoint'] or os.path.abspath(path)
+        self.authors = {}
+        self.groups = dict(Group.objects.values_list('slug', 'pk'))
+
+        done = self.read_checkpoint()
+        if done:
+            self.stdout.write(f'Продолжаем с записи {done}.')
+        records = islice(READERS[feed_format](path), done, None)
+        imported = skipped = 0
+        started = time.monotonic()
+        while True:
+            chunk = list(islice(records, self.chunk_size))
+            if not chunk:
+                break
+            posts, errors = self.build_posts(chunk, done)
+            done += len(chunk)
+            # Контрольная точка сохраняется в транзакции вставки: после
+            # падения пачка не окажется вставленной без неё и не
+            # импортируется второй раз.
+            if posts:
+                bulk_insert_posts(
+                    posts, checkpoint=partial(self.write_checkpoint, done))
+            else:
+                self.write_checkpoint(done)
+            imported += len(posts)
+            skipped += len(errors)
+            for line, error in errors:
+                self.stderr.write(f'Запись {line}: {error}')
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'Обработано {done}, импортировано {imported}, '
+                f'пропущено {skipped}, '
+                f'{imported / max(elapsed, 1e-6):.0f} записей/с.'
+            )
+        ImportCheckpoint.objects.filter(source=self.checkpoint).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Импорт завершён: {imported} публикаций, пропущено {skipped}.'))
+
+    def build_posts(self, chunk, offset):
+        self.resolve_authors({
+            record.get('author') for record in chunk
+            if isinstance(record, dict)
+            and isinstance(record.get('author'), str)
+        } - set(self.authors))
+        now = timezone.now()
+        posts, errors = [], []
+        for line, record in enumerate(chunk, start=offset + 1):
+            if not isinstance(record, dict):
+                errors.append((line, 'Не удалось разобрать запись.'))
+                continue
+            try:
+                posts.append(self.build_post(record, now))
+            except ValidationError as error:
+                errors.append((line, ' '.join(error.messages)))
+        return posts, errors
+
+    def build_post(self, record, now):
+        text = string_field(record, 'text')
+        validate_text(text)
+        author = string_field(record, 'author')
+        author_id = self.authors.get(author)
+        if author_id is None:
+            raise ValidationError(f'Нет автора {author!r}.')
+        group_id = None
+        group = string_field(record, 'group')
+        if group:
+            group_id = self.groups.get(group)
+            if group_id is None:
+                raise ValidationError(f'Нет группы {group!r}.')
+        pub_date = now
+        raw_date = string_field(record, 'pub_date')
+        if raw_date:
+            try:
+                pub_date = parse_datetime(raw_date)
+            except ValueError:
+                # Формат верный, но такой даты нет: 2020-13-01.
+                pub_date = None
+            if pub_date is None:
+                raise ValidationError(f'Неверная дата {raw_date!r}.')
+            if timezone.is_naive(pub_date):
+                pub_date = timezone.make_aware(pub_date, timezone.utc)
+        return Post(text=text, author_id=author_id, group_id=group_id,
+                    pub_date=pub_date)
+
+    def resolve_authors(self, usernames):
+        usernames.discard(None)
+        if not usernames:
+            return
+        self.authors.update(User.objects.filter(
+            username__in=usernames).values_list('username', 'pk'))
+        missing = usernames - set(self.authors)
+        if missing and self.create_authors:
+            users = []
+            for username in missing:
+                user = User(username=username)
+                user.set_unusable_password()
+                users.append(user)
+            User.objects.bulk_create(users)
+            self.authors.update(User.objects.filter(
+                username__in=missing).values_list('username', 'pk'))
+
+    def read_checkpoint(self):
+        checkpoint = ImportCheckpoint.objects.filter(
+            source=self.checkpoint).first()
+        return checkpoint.records if checkpoint else 0
+
+    def write_checkpoint(self, done):
+        ImportCheckpoint.objects.update_or_create(
+            source=self.checkpoint, defaults={'records': done})
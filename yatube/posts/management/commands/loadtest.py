@@ -0,0 +1,138 @@
+import json
+import os
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from posts.benchmark import benchmark_database, ensure_dataset
+from posts.loadtest import DEFAULT_MIX, LoadTest, parse_mix, stock_sqlite
+
+
+class Command(BaseCommand):
+    help = ('Нагружает yatube.wsgi.application из пула потоков смесью '
+            'чтений и записей и выводит пропускную способность, '
+            'гистограммы задержек и долю ошибок «database is locked».')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10,
+            help='Длительность нагрузки в секундах.',
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            help='Остановиться после стольких запросов на поток.',
+        )
+        parser.add_argument(
+            '--mix',
+            default=','.join(f'{name}={weight}'
+                             for name, weight in DEFAULT_MIX.items()),
+            help='Веса операций: index, group, profile, post_detail, '
+                 'post_create, post_edit.',
+        )
+        parser.add_argument(
+            '--writers',
+            type=int,
+            default=10,
+            help='Сколько авторов публикуют и правят посты.',
+        )
+        parser.add_argument(
+            '--sqlite',
+            choices=('tuned', 'stock', 'both'),
+            default='tuned',
+            help='tuned — настройки из DATABASES, stock — стандартные '
+                 'PRAGMA SQLite, both — прогнать оба и сравнить.',
+        )
+        parser.add_argument(
+            '--rate-limits',
+            action='store_true',
+            help='Не отключать RATE_LIMITS: без этого флага все запросы '
+                 'прогона идут с одного адреса и упираются в лимиты.',
+        )
+        parser.add_argument('--posts', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', '-o', help='Файл для JSON-отчёта.')
+        parser.add_argument(
+            '--database',
+            default=os.path.join(settings.BASE_DIR, 'benchmark.sqlite3'),
+            help='Отдельная база для прогона, общая с benchmark.',
+        )
+        parser.add_argument(
+            '--no-isolate',
+            action='store_true',
+            help='Нагружать текущую базу, не создавая отдельной.',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            options['mix'] = parse_mix(options['mix'])
+        except ValueError as error:
+            raise CommandError(error)
+        with ExitStack() as stack:
+            if not options['rate_limits']:
+                stack.enter_context(override_settings(RATE_LIMITS={}))
+            if not options['no_isolate']:
+                stack.enter_context(benchmark_database(options['database']))
+                ensure_dataset(options['posts'], seed=options['seed'])
+            return self.run(options)
+
+    def run(self, options):
+        reports = {}
+        if options['sqlite'] in ('stock', 'both'):
+            with stock_sqlite():
+                reports['stock'] = self.load(options, 'stock')
+        if options['sqlite'] in ('tuned', 'both'):
+            reports['tuned'] = self.load(options, 'tuned')
+        if len(reports) == 1:
+            result = reports.popitem()[1]
+        else:
+            result = {**reports, 'speedup': speedup(**reports)}
+            self.stdout.write(self.style.SUCCESS(
+                'Ускорение tuned к stock: ' + ', '.join(
+                    f'{name} ×{ratio}'
+                    for name, ratio in result['speedup'].items())))
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                json.dump(result, output, ensure_ascii=False, indent=2)
+
+    def load(self, options, title):
+        from yatube.wsgi import application
+
+        try:
+            load = LoadTest(application, options['mix'], options['threads'],
+                            options['writers'], options['seed'])
+        except ValueError as error:
+            raise CommandError(error)
+        report = load.run(options['duration'], options['requests'])
+        self.stdout.write(
+            f'[{title}] {report["threads"]} потоков, {report["requests"]} '
+            f'запросов за {report["elapsed_s"]} с: {report["rps"]} запр/с, '
+            f'database is locked: {report["locked_rate"]:.2%}'
+        )
+        for operation, result in report['operations'].items():
+            self.stdout.write(
+                f'  {operation:<12} {result["requests"]:>6} запр. '
+                f'{result["rps"]:>7} запр/с  p50 {result["p50_ms"]:>8} мс  '
+                f'p99 {result["p99_ms"]:>8} мс  ошибки {result["errors"]}'
+            )
+            self.stdout.write('    ' + '  '.join(
+                f'{bucket}: {count}'
+                for bucket, count in result['histogram'].items() if count))
+        return report
+
+
+def speedup(stock, tuned):
+    """Во сколько раз выросла пропускная способность: всего и по каждой
+    операции."""
+    ratios = {'total': round(tuned['rps'] / max(stock['rps'], 1e-6), 2)}
+    for operation, result in tuned['operations'].items():
+        before = stock['operations'].get(operation)
+        if before:
+            ratios[operation] = round(
+                result['rps'] / max(before['rps'], 1e-6), 2)
+    return ratios
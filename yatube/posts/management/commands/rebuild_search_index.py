@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from posts.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс публикаций FTS5.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--optimize',
+            action='store_true',
+            help='После перестроения объединить сегменты индекса.',
+        )
+
+    def handle(self, *args, **options):
+        rebuild_index(optimize=options['optimize'])
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен.'))
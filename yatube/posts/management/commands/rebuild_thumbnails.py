@@ -0,0 +1,56 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from core.jobs import process_executor
+from posts.models import Post
+from posts.tasks import make_thumbnails_batch
+
+
+class Command(BaseCommand):
+    help = ('Строит миниатюры картинок постов заново в нескольких '
+            'процессах.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing',
+            action='store_true',
+            help='Только посты, у которых миниатюр ещё нет.',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help='Число процессов; 1 — строить в этом процессе.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Сколько постов отдавать процессу за раз.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='')
+        if options['missing']:
+            posts = posts.filter(thumbnails='')
+        post_ids = list(posts.order_by('pk').values_list('pk', flat=True))
+        size = options['batch_size']
+        batches = [post_ids[start:start + size]
+                   for start in range(0, len(post_ids), size)]
+        if options['workers'] == 1:
+            self.report(batches, map(make_thumbnails_batch, batches))
+            return
+        with process_executor(options['workers']) as executor:
+            self.report(batches,
+                        executor.map(make_thumbnails_batch, batches))
+
+    def report(self, batches, results):
+        total = sum(map(len, batches))
+        processed = built = 0
+        for batch, count in zip(batches, results):
+            processed += len(batch)
+            built += count
+            self.stdout.write(f'Обработано постов: {processed} из {total}.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Миниатюры построены для {built} постов.'))
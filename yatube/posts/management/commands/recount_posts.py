@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts.models import AuthorStats
+from posts.utils import count_posts_by_author
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает и проверяет хранимые счётчики постов авторов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только проверить счётчики, ничего не исправляя.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пачки для bulk_create/bulk_update.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        with transaction.atomic():
+            counts = count_posts_by_author()
+            stale = []
+            for stats in AuthorStats.objects.select_for_update():
+                actual = counts.pop(stats.author_id, 0)
+                if stats.posts_count != actual:
+                    stats.posts_count = actual
+                    stale.append(stats)
+            missing = [
+                AuthorStats(author_id=author_id, posts_count=total)
+                for author_id, total in counts.items()
+            ]
+            if options['check']:
+                if stale or missing:
+                    raise CommandError(
+                        f'Расхождений: {len(stale)}, '
+                        f'отсутствующих счётчиков: {len(missing)}.'
+                    )
+                self.stdout.write(self.style.SUCCESS(
+                    'Счётчики постов совпадают.'))
+                return
+            AuthorStats.objects.bulk_update(
+                stale, ['posts_count'], batch_size=batch_size)
+            AuthorStats.objects.bulk_create(missing, batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено: {len(stale)}, создано: {len(missing)}.'))
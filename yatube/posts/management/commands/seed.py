@@ -0,0 +1,59 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts.seed import seed_posts
+
+
+class Command(BaseCommand):
+    help = ('Быстро генерирует детерминированный набор пользователей, групп '
+            'и публикаций, растянутых на несколько лет, для профилирования '
+            'и бенчмарков.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=100000)
+        parser.add_argument(
+            '--years',
+            type=int,
+            default=3,
+            help='На сколько лет растянуть даты публикаций.',
+        )
+        parser.add_argument(
+            '--ungrouped',
+            type=float,
+            default=0.2,
+            help='Доля публикаций без группы.',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Одинаковый seed даёт одинаковые данные.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=10000,
+            help='Сколько строк вставлять в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        def progress(done):
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f'Публикаций: {done}, {done / max(elapsed, 1e-6):.0f} в с.')
+
+        seed_posts(
+            options['posts'], options['users'], options['groups'],
+            seed=options['seed'], batch_size=options['batch_size'],
+            ungrouped=options['ungrouped'], years=options['years'],
+            progress=progress,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово за {time.monotonic() - started:.1f} с: '
+            f'{options["users"]} пользователей, {options["groups"]} групп, '
+            f'{options["posts"]} публикаций.'))
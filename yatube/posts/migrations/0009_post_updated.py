@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0008_authorstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, help_text='Дата последнего изменения поста', verbose_name='Дата изменения'),
+        ),
+    ]
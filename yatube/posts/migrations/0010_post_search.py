@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0009_post_updated'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql=[
+                "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+                "text, content='posts_post', content_rowid='id', "
+                "tokenize='unicode61 remove_diacritics 2')",
+                "CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post "
+                "BEGIN "
+                "INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text); "
+                "END",
+                "CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post "
+                "BEGIN "
+                "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+                "VALUES ('delete', old.id, old.text); "
+                "END",
+                "CREATE TRIGGER posts_post_fts_update AFTER UPDATE OF text ON posts_post "
+                "BEGIN "
+                "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+                "VALUES ('delete', old.id, old.text); "
+                "INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text); "
+                "END",
+                "INSERT INTO posts_post_fts(posts_post_fts) VALUES ('rebuild')",
+            ],
+            reverse_sql=[
+                "DROP TRIGGER posts_post_fts_update",
+                "DROP TRIGGER posts_post_fts_delete",
+                "DROP TRIGGER posts_post_fts_insert",
+                "DROP TABLE posts_post_fts",
+            ],
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:22
+
+from django.db import migrations, models
+
+
+# SQLite добавляет столбцы, пересоздавая таблицу, и триггеры индекса FTS5
+# из 0010_post_search пропадают вместе со старой таблицей.
+FTS_TRIGGERS = [
+    "CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post "
+    "BEGIN "
+    "INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text); "
+    "END",
+    "CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post "
+    "BEGIN "
+    "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "END",
+    "CREATE TRIGGER posts_post_fts_update AFTER UPDATE OF text ON posts_post "
+    "BEGIN "
+    "INSERT INTO posts_post_fts(posts_post_fts, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    "INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text); "
+    "END",
+]
+DROP_FTS_TRIGGERS = [
+    "DROP TRIGGER IF EXISTS posts_post_fts_update",
+    "DROP TRIGGER IF EXISTS posts_post_fts_delete",
+    "DROP TRIGGER IF EXISTS posts_post_fts_insert",
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_post_search'),
+    ]
+
+    operations = [
+        migrations.RunSQL(migrations.RunSQL.noop, reverse_sql=FTS_TRIGGERS),
+        migrations.AddField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, help_text='Картинка к публикации', upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='thumbnails',
+            field=models.TextField(blank=True, editable=False, help_text='Готовые миниатюры картинки в JSON: адрес и размеры', verbose_name='Миниатюры'),
+        ),
+        migrations.RunSQL(DROP_FTS_TRIGGERS + FTS_TRIGGERS,
+                          reverse_sql=DROP_FTS_TRIGGERS),
+    ]
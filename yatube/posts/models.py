@@ -1,3 +1,5 @@
+import json
+
 from django.db import models
 from django.contrib.auth import get_user_model
 
@@ -42,6 +44,11 @@ class Post(models.Model):
         verbose_name='Дата публикации',
         help_text='Дата публикации поста',
     )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+        help_text='Дата последнего изменения поста',
+    )
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -58,11 +65,82 @@ class Post(models.Model):
         verbose_name='Группа',
         help_text='Имя группы для публикаций',
     )
+    image = models.ImageField(
+        upload_to='posts/',
+        blank=True,
+        verbose_name='Картинка',
+        help_text='Картинка к публикации',
+    )
+    thumbnails = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Миниатюры',
+        help_text='Готовые миниатюры картинки в JSON: адрес и размеры',
+    )
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['author', '-pub_date', '-id'],
+                         name='post_author_feed_idx'),
+            models.Index(fields=['group', '-pub_date', '-id'],
+                         name='post_group_feed_idx'),
+            models.Index(fields=['-pub_date', '-id'],
+                         name='post_feed_idx'),
+        ]
         verbose_name = 'Публикация'
         verbose_name_plural = 'Публикации'
 
     def __str__(self):
         return self.text[:settings.SELF_TEXT_LENGTH]
+
+    def get_thumbnails(self):
+        """Миниатюры по именам из POSTS_THUMBNAILS: {'url', 'width',
+        'height'}. Пустой словарь, пока их не построила фоновая задача."""
+        return json.loads(self.thumbnails) if self.thumbnails else {}
+
+
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Автор',
+        help_text='Автор, для которого ведётся счётчик',
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Количество публикаций',
+        help_text='Хранимое число публикаций автора',
+    )
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+    def __str__(self):
+        return f'{self.author}: {self.posts_count}'
+
+
+class ImportCheckpoint(models.Model):
+    source = models.CharField(
+        max_length=500,
+        unique=True,
+        verbose_name='Источник',
+        help_text='Путь к файлу импорта или ключ из --checkpoint',
+    )
+    records = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Обработано записей',
+    )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения',
+    )
+
+    class Meta:
+        verbose_name = 'Контрольная точка импорта'
+        verbose_name_plural = 'Контрольные точки импорта'
+
+    def __str__(self):
+        return f'{self.source}: {self.records}'
@@ -0,0 +1,181 @@
+"""Кэш целых страниц лент и постов для анонимных читателей.
+
+Страница кэшируется под ключом из пути, номера страницы (или курсора) и
+версий её областей: 'index', 'group:<id>', 'author:<id>', 'post:<id>'.
+Изменение поста повышает версии затронутых областей, и все их страницы
+разом перестают находиться в кэше; остальные страницы не трогаются.
+
+Версия области — время её последнего изменения в миллисекундах, поэтому
+из тех же версий строятся ETag и Last-Modified для условных GET.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.views.decorators.http import condition
+
+from core.routers import use_primary_if_stale
+
+from . import settings
+from .models import Group, Post, User
+
+
+PAGE_PARAMS = ('page', 'cursor', 'format', 'fields', 'limit')
+
+
+def scope_version_key(scope):
+    return f'posts:scope:{scope}'
+
+
+def new_version():
+    # Версия от времени, а не 1: после вытеснения ключа из кэша старые
+    # страницы не должны снова совпасть с новой версией.
+    return int(time.time() * 1000)
+
+
+def get_scope_versions(scopes):
+    keys = [scope_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def invalidate_scopes(*scopes):
+    keys = [scope_version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    now = new_version()
+    cache.set_many({
+        key: max(now, versions.get(key, 0) + 1) for key in keys
+    }, None)
+
+
+def invalidate_post_pages(post, old_group_id=None):
+    scopes = ['index', f'post:{post.pk}', f'author:{post.author_id}']
+    for group_id in {post.group_id, old_group_id}:
+        if group_id is not None:
+            scopes.append(f'group:{group_id}')
+    invalidate_scopes(*scopes)
+
+
+def related_scopes(related, **filters):
+    """Области related ('group' или 'author') постов, отобранных filters."""
+    related_ids = Post.objects.filter(**filters).order_by().values_list(
+        f'{related}_id', flat=True).distinct()
+    return [f'{related}:{pk}' for pk in related_ids if pk is not None]
+
+
+def invalidate_renamed_pages(scope, related, **filters):
+    """Сбрасывает страницы после переименования группы или автора: его
+    собственные, ленту и страницы related ('group' или 'author') его
+    постов."""
+    invalidate_scopes('index', scope, *related_scopes(related, **filters))
+
+
+def page_digest(request, versions):
+    page = '&'.join(
+        f'{name}={request.GET.get(name, "")}' for name in PAGE_PARAMS)
+    raw = f'{request.path}?{page}|{versions}'
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def page_cache_key(request, scopes):
+    return 'posts:page:' + page_digest(request, get_scope_versions(scopes))
+
+
+def scopes_last_modified(scopes):
+    versions = get_scope_versions(scopes)
+    return datetime.fromtimestamp(max(versions) / 1000, timezone.utc)
+
+
+def resolve_scopes(get_scopes, request, *args, **kwargs):
+    # Области запоминаются на запросе: их используют и условный GET,
+    # и кэш страницы.
+    if not hasattr(request, '_page_scopes'):
+        request._page_scopes = get_scopes(request, *args, **kwargs)
+        # Страница, изменённая после снимка реплики, читается с основной
+        # базы.
+        use_primary_if_stale(scopes_last_modified(request._page_scopes))
+    return request._page_scopes
+
+
+def index_scopes(request):
+    return ['index']
+
+
+def group_scopes(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True).first()
+    return [f'group:{group_id}']
+
+
+def profile_scopes(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    return [f'author:{author_id}']
+
+
+def post_scopes(request, post_id):
+    # Страница поста показывает и число постов автора, поэтому зависит
+    # ещё и от области автора.
+    author_id = Post.objects.filter(pk=post_id).values_list(
+        'author_id', flat=True).first()
+    return [f'post:{post_id}', f'author:{author_id}']
+
+
+def cache_anonymous_page(get_scopes):
+    """Кэширует ответ view для анонимных GET-запросов. get_scopes получает
+    аргументы view и возвращает области, от которых зависит страница."""
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if (request.method not in ('GET', 'HEAD')
+                    or request.user.is_authenticated):
+                return view(request, *args, **kwargs)
+            key = page_cache_key(request, resolve_scopes(
+                get_scopes, request, *args, **kwargs))
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+            else:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200 or response.streaming:
+                    return response
+                cache.set(
+                    key,
+                    (response.content, response['Content-Type']),
+                    settings.POSTS_PAGE_CACHE_TIMEOUT,
+                )
+            # CompressionMiddleware хранит сжатую страницу рядом с ней.
+            response.compressed_cache = (
+                key, settings.POSTS_PAGE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
+
+
+def conditional_page(get_scopes):
+    """ETag и Last-Modified по версиям областей страницы: повторный запрос
+    без изменений получает 304 без обращения к шаблонам."""
+    def etag(request, *args, **kwargs):
+        if len(get_messages(request)):
+            return None
+        versions = get_scope_versions(
+            resolve_scopes(get_scopes, request, *args, **kwargs))
+        user = request.user.pk if request.user.is_authenticated else 'anon'
+        return page_digest(request, [user, *versions])
+
+    def last_modified(request, *args, **kwargs):
+        if len(get_messages(request)):
+            return None
+        return scopes_last_modified(
+            resolve_scopes(get_scopes, request, *args, **kwargs))
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
@@ -0,0 +1,75 @@
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+
+
+FTS_TABLE = 'posts_post_fts'
+WORD_RE = re.compile(r'\w+')
+
+
+def build_match(query):
+    """Строка поиска в выражение FTS5: каждое слово в кавычках, чтобы
+    пользовательский ввод не разбирался как синтаксис запроса."""
+    return ' '.join(f'"{word}"' for word in WORD_RE.findall(query))
+
+
+def matching_ids(match):
+    return RawSQL(
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+
+
+class SearchResults:
+    """Выдача поиска для Paginator: count() и срезы выполняются по индексу
+    FTS5 в порядке релевантности, посты достаются одним запросом по id."""
+
+    def __init__(self, query, queryset=None):
+        self.match = build_match(query)
+        if queryset is None:
+            queryset = Post.objects.select_related('author', 'group')
+        self.queryset = queryset
+
+    def count(self):
+        if not self.match:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+                [self.match],
+            )
+            return cursor.fetchone()[0]
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError('SearchResults поддерживает только срезы.')
+        if not self.match:
+            return []
+        start = index.start or 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY rank LIMIT %s OFFSET %s',
+                [self.match, index.stop - start, start],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        posts = self.queryset.in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+def filter_posts(queryset, query):
+    """Фильтрует queryset по полнотекстовому индексу."""
+    match = build_match(query)
+    if not match:
+        return queryset.none()
+    return queryset.filter(id__in=matching_ids(match))
+
+
+def rebuild_index(optimize=False):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+        if optimize:
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
@@ -0,0 +1,174 @@
+import random
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.utils import timezone
+from faker import Faker
+
+from .bulk import POST_COLUMNS, insert_rows, rebuild_author_stats
+from .models import Group, Post, User
+from .settings import SLUG_MAX_LENGTH
+from .search import rebuild_index
+
+
+# Даты отсчитываются назад от фиксированного момента, чтобы одинаковые
+# параметры давали одинаковую базу.
+SEED_EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+SEED_POOL = 1000
+# Сколько username искать одним запросом: лимит переменных SQLite 999.
+LOOKUP_CHUNK = 500
+
+
+def zipf_weights(size, exponent=1.1):
+    """Накопленные веса распределения Ципфа для random.choices: k-й по
+    популярности элемент выбирается с весом 1 / k ** exponent."""
+    return list(accumulate(1 / rank ** exponent
+                           for rank in range(1, size + 1)))
+
+
+class Pools:
+    """Заготовки Faker: генерировать миллионы строк поштучно слишком
+    долго, поэтому строки собираются из тысячи готовых вариантов."""
+
+    def __init__(self, seed, size=SEED_POOL):
+        fake = Faker('ru_RU')
+        fake.seed_instance(seed)
+        self.texts = [fake.paragraph(nb_sentences=5) for _ in range(size)]
+        self.first_names = [fake.first_name() for _ in range(size)]
+        self.last_names = [fake.last_name() for _ in range(size)]
+        self.logins = [fake.user_name() for _ in range(size)]
+        self.words = [fake.word() for _ in range(size)]
+
+
+def lookup_ids(model, field, values):
+    """pk объектов в порядке values."""
+    ids = {}
+    for start in range(0, len(values), LOOKUP_CHUNK):
+        ids.update(model.objects.filter(**{
+            f'{field}__in': values[start:start + LOOKUP_CHUNK],
+        }).values_list(field, 'pk'))
+    return [ids[value] for value in values]
+
+
+@contextmanager
+def deferred_indexes(table):
+    """Удаляет индексы и триггеры таблицы на время массовой вставки и
+    создаёт их заново одним проходом в конце. Внешние ключи на это время
+    не проверяются, после вставки проверяются разом."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT type, name, sql FROM sqlite_master "
+            "WHERE tbl_name = %s AND type IN ('index', 'trigger') "
+            "AND sql IS NOT NULL", [table])
+        deferred = cursor.fetchall()
+        for kind, name, _ in deferred:
+            cursor.execute(
+                f'DROP {kind.upper()} {connection.ops.quote_name(name)}')
+    disabled = connection.disable_constraint_checking()
+    try:
+        yield
+    finally:
+        if disabled:
+            connection.enable_constraint_checking()
+        with connection.cursor() as cursor:
+            for _, _, sql in deferred:
+                cursor.execute(sql)
+    connection.check_constraints(table_names=[table])
+
+
+def seed_authors(count, rng, pools, batch_size=10000):
+    """count пользователей с правдоподобными именами; существующие с теми
+    же username пропускаются. Возвращает pk в порядке номеров."""
+    usernames = [f'{pools.logins[number % len(pools.logins)]}{number}'
+                 for number in range(count)]
+    fields = ('username', 'first_name', 'last_name', 'email', 'password',
+              'is_superuser', 'is_staff', 'is_active', 'date_joined')
+    for start in range(0, count, batch_size):
+        rows = [
+            (
+                username,
+                rng.choice(pools.first_names),
+                rng.choice(pools.last_names),
+                f'{username}@example.com',
+                UNUSABLE_PASSWORD_PREFIX,
+                False, False, True,
+                SEED_EPOCH - timedelta(days=rng.uniform(0, 3650)),
+            )
+            for username in usernames[start:start + batch_size]
+        ]
+        with transaction.atomic():
+            insert_rows(User, fields, rows, ignore_conflicts=True)
+    return lookup_ids(User, 'username', usernames)
+
+
+def seed_groups(count, pools):
+    # Слаг латиницей из логинов: в адресе group/<slug> только ASCII.
+    slugs = [
+        f'{pools.logins[number % len(pools.logins)][:SLUG_MAX_LENGTH - 8]}'
+        f'-{number}' for number in range(count)
+    ]
+    Group.objects.bulk_create([
+        Group(title=pools.words[number % len(pools.words)].capitalize(),
+              slug=slug,
+              description=pools.texts[number % len(pools.texts)])
+        for number, slug in enumerate(slugs)
+    ], ignore_conflicts=True)
+    return lookup_ids(Group, 'slug', slugs)
+
+
+def seed_posts(posts, authors, groups, seed=0, batch_size=10000,
+               ungrouped=0.2, years=3, progress=None, replace=False):
+    """Генерирует posts постов от authors авторов в groups группах за
+    years лет до SEED_EPOCH. Авторы и группы выбираются по Ципфу: первые
+    самые активные. Доля ungrouped постов остаётся без группы.
+
+    Посты вставляются пачками через executemany при снятых индексах,
+    триггерах поиска и проверке внешних ключей; индексы, поисковый индекс
+    и счётчики авторов строятся один раз в конце. При одинаковом seed
+    получается одинаковый набор данных. progress(done) вызывается после
+    каждой пачки. replace сначала удаляет все прежние посты одним DELETE,
+    тоже при снятых индексах и триггерах, мимо ORM и сигналов."""
+    rng = random.Random(seed)
+    pools = Pools(seed)
+    author_ids = seed_authors(authors, rng, pools, batch_size)
+    group_ids = seed_groups(groups, pools)
+    author_weights = zipf_weights(len(author_ids))
+    group_weights = zipf_weights(len(group_ids))
+    step = timedelta(days=365 * years) / max(posts, 1)
+    first_date = SEED_EPOCH - step * posts
+    counts = Counter()
+    table = Post._meta.db_table
+    with deferred_indexes(table):
+        if replace:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {connection.ops.quote_name(table)}')
+        for start in range(0, posts, batch_size):
+            size = min(batch_size, posts - start)
+            authors_batch = rng.choices(
+                author_ids, cum_weights=author_weights, k=size)
+            groups_batch = rng.choices(
+                group_ids, cum_weights=group_weights, k=size)
+            counts.update(authors_batch)
+            rows = []
+            for number, (author_id, group_id) in enumerate(
+                    zip(authors_batch, groups_batch), start=start):
+                pub_date = first_date + step * (number + rng.random())
+                rows.append((
+                    rng.choice(pools.texts), pub_date, pub_date, author_id,
+                    None if rng.random() < ungrouped else group_id, '', '',
+                ))
+            with transaction.atomic():
+                insert_rows(Post, POST_COLUMNS, rows)
+            if progress is not None:
+                progress(start + size)
+    rebuild_index()
+    rebuild_author_stats()
+    # Версии страниц и счётчики в кэше устарели для всех лент сразу.
+    cache.clear()
+    return counts
@@ -2,3 +2,20 @@ POSTS_PER_PAGE = 10
 SELF_TEXT_LENGTH = 15
 TEXT_LENGTH_MINIMAL = 10
 SLUG_MAX_LENGTH = 30
+POSTS_NUMBERED_PAGES = 10
+POSTS_COUNT_CACHE_TIMEOUT = 60
+POSTS_PAGE_CACHE_TIMEOUT = 60 * 15
+POSTS_PAGE_RANGE_ON_EACH_SIDE = 2
+POSTS_PAGE_RANGE_ON_ENDS = 1
+POSTS_FEED_SIZE = 500
+POSTS_FEED_CHUNK_SIZE = 100
+POSTS_API_LIMIT = 100
+# Миниатюры картинок постов: строятся фоновой задачей при загрузке.
+# *_2x — вдвое больше для экранов высокой плотности.
+POSTS_THUMBNAILS = {
+    'feed': {'geometry': '960x339', 'crop': 'center'},
+    'feed_2x': {'geometry': '1920x678', 'crop': 'center'},
+    'detail': {'geometry': '960', 'upscale': False},
+    'detail_2x': {'geometry': '1920', 'upscale': False},
+}
+POSTS_THUMBNAIL_QUALITY = 85
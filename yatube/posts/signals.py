@@ -0,0 +1,116 @@
+from django.core.cache import cache
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from core.jobs import enqueue
+
+from .models import Group, Post, User
+from .page_cache import (invalidate_post_pages, invalidate_scopes,
+                         related_scopes)
+from .tasks import delete_image, make_thumbnails, refresh_renamed_cards
+from .utils import (change_author_posts_count, invalidate_posts_count,
+                    posts_count_key, touch_posts)
+
+# Поля, которые выводятся в карточке поста.
+CARD_FIELDS = {
+    Group: ('title', 'slug'),
+    User: ('username', 'first_name', 'last_name'),
+}
+
+
+def card_fields_changed(sender, instance, update_fields):
+    fields = CARD_FIELDS[sender]
+    if instance.pk is None or (
+            update_fields is not None and not set(fields) & update_fields):
+        return False
+    old = sender.objects.filter(pk=instance.pk).values_list(*fields).first()
+    new = tuple(getattr(instance, field) for field in fields)
+    return old is not None and old != new
+
+
+@receiver(pre_save, sender=Post)
+def remember_old_values(sender, instance, **kwargs):
+    instance._old_group_id, instance._old_image = None, ''
+    if instance.pk is not None:
+        instance._old_group_id, instance._old_image = sender.objects.filter(
+            pk=instance.pk).values_list('group_id', 'image').first() or (
+            None, '')
+    if instance.image.name != instance._old_image:
+        # Миниатюры прежней картинки больше не годятся; новые построит
+        # фоновая задача.
+        instance.thumbnails = ''
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    invalidate_post_pages(instance, instance._old_group_id)
+    if instance.image.name != instance._old_image:
+        if instance.image:
+            enqueue(make_thumbnails, instance.pk, queue='thumbnails')
+        if instance._old_image:
+            enqueue(delete_image, instance._old_image, queue='thumbnails')
+    if created:
+        change_author_posts_count(instance.author_id, 1)
+        invalidate_posts_count(instance.author_id, instance.group_id)
+    elif instance._old_group_id != instance.group_id:
+        cache.delete_many([
+            posts_count_key('group', group_id)
+            for group_id in (instance._old_group_id, instance.group_id)
+            if group_id is not None
+        ])
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    invalidate_post_pages(instance)
+    if instance.image:
+        enqueue(delete_image, instance.image.name, queue='thumbnails')
+    change_author_posts_count(instance.author_id, -1)
+    invalidate_posts_count(instance.author_id, instance.group_id)
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_save, sender=User)
+def remember_rename(sender, instance, update_fields=None, **kwargs):
+    instance._card_fields_changed = card_fields_changed(
+        sender, instance, update_fields)
+
+
+def renamed(scope, related, filters):
+    # Своя страница группы или автора выводит имя только в заголовке и
+    # сбрасывается сразу. Переименование трогает все посты, поэтому
+    # обновление их карточек и страниц с ними уходит в фоновую задачу.
+    invalidate_scopes(scope)
+    enqueue(refresh_renamed_cards, scope, related, filters, queue='cache')
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    if getattr(instance, '_card_fields_changed', False):
+        renamed(f'group:{instance.pk}', 'author', {'group_id': instance.pk})
+    elif not created:
+        # Описание выводится только на странице группы.
+        invalidate_scopes(f'group:{instance.pk}')
+
+
+@receiver(pre_delete, sender=Group)
+def remember_group_posts(sender, instance, **kwargs):
+    # Посты удаляемой группы теряют её через SET_NULL, минуя save(): их
+    # карточки обновляются, а области запоминаются, пока посты ещё
+    # находятся по группе.
+    touch_posts(group_id=instance.pk)
+    instance._post_scopes = related_scopes('author', group_id=instance.pk)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    invalidate_scopes('index', f'group:{instance.pk}',
+                      *getattr(instance, '_post_scopes', ()))
+    cache.delete(posts_count_key('group', instance.pk))
+
+
+@receiver(post_save, sender=User)
+def author_saved(sender, instance, **kwargs):
+    if getattr(instance, '_card_fields_changed', False):
+        renamed(f'author:{instance.pk}', 'group', {'author_id': instance.pk})
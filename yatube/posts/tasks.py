@@ -0,0 +1,56 @@
+"""Фоновые задачи постов для core.jobs."""
+import json
+
+from django.utils import timezone
+from sorl.thumbnail import delete, get_thumbnail
+
+from . import settings
+from .models import Post
+from .page_cache import invalidate_post_pages, invalidate_renamed_pages
+from .utils import touch_posts
+
+
+def refresh_renamed_cards(scope, related, filters):
+    """После переименования группы или автора обновляет карточки всех его
+    постов и сбрасывает страницы, где они выводятся."""
+    touch_posts(**filters)
+    invalidate_renamed_pages(scope, related, **filters)
+
+
+def make_thumbnails(post_id):
+    """Строит миниатюры POSTS_THUMBNAILS для картинки поста и сохраняет их
+    адреса и размеры в Post.thumbnails, чтобы шаблоны не обращались ни к
+    sorl-thumbnail, ни к хранилищу."""
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or not post.image:
+        return False
+    thumbnails = {}
+    for name, options in settings.POSTS_THUMBNAILS.items():
+        options = dict(options)
+        thumbnail = get_thumbnail(
+            post.image, options.pop('geometry'),
+            quality=settings.POSTS_THUMBNAIL_QUALITY, **options)
+        thumbnails[name] = {
+            'url': thumbnail.url,
+            'width': thumbnail.width,
+            'height': thumbnail.height,
+        }
+    # Картинку могли заменить, пока строились миниатюры: тогда их построит
+    # задача, поставленная при замене.
+    updated = Post.objects.filter(pk=post_id, image=post.image.name).update(
+        thumbnails=json.dumps(thumbnails), updated=timezone.now())
+    if updated:
+        invalidate_post_pages(post)
+    return bool(updated)
+
+
+def make_thumbnails_batch(post_ids):
+    """Для пула процессов команды rebuild_thumbnails."""
+    return sum(make_thumbnails(post_id) for post_id in post_ids)
+
+
+def delete_image(name):
+    """Удаляет картинку удалённого или изменённого поста вместе с её
+    миниатюрами."""
+    if not Post.objects.filter(image=name).exists():
+        delete(name)
@@ -0,0 +1,344 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Count
+from django.db.models.signals import post_delete
+from django.test import TestCase, TransactionTestCase, override_settings
+from PIL import Image
+
+from about import urls as about_urls
+from users import urls as users_urls
+
+from .. import urls as posts_urls
+from ..benchmark import ensure_dataset
+from ..bulk import add_author_posts_counts
+from ..models import AuthorStats, Group, ImportCheckpoint, Post
+from ..search import SearchResults
+from ..seed import seed_posts
+
+User = get_user_model()
+
+
+class ImportPostsCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.test_group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def import_posts(self, path, *args):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_posts', path, *args, stdout=stdout,
+                     stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_import_jsonl(self):
+        """Импорт JSONL сохраняет даты, группы и счётчики авторов, а
+        невалидные записи пропускает."""
+        records = [
+            {'text': 'Импортированный пост 1', 'author': 'auth',
+             'group': 'test-slug', 'pub_date': '2015-01-02T03:04:05'},
+            {'text': 'Импортированный пост 2', 'author': 'auth'},
+            {'text': 'Коротко', 'author': 'auth'},
+            {'text': 'Пост неизвестного автора', 'author': 'nobody'},
+        ]
+        path = self.write('posts.jsonl', '\n'.join(
+            json.dumps(record) for record in records) + '\n{broken\n')
+        _, errors = self.import_posts(path, '--chunk-size', '2')
+        self.assertEqual(Post.objects.count(), 2)
+        post = Post.objects.get(text='Импортированный пост 1')
+        self.assertEqual(post.pub_date.year, 2015)
+        self.assertEqual(post.group, self.test_group)
+        self.assertEqual(AuthorStats.objects.get(author=self.user).posts_count,
+                         2)
+        self.assertIn('Запись 3', errors)
+        self.assertIn('Запись 5', errors)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_import_skips_malformed_fields(self):
+        records = [
+            {'text': 'Пост с несуществующей датой', 'author': 'auth',
+             'pub_date': '2020-13-01T00:00:00'},
+            {'text': 12345678901, 'author': 'auth'},
+            {'text': 'Пост с автором-списком', 'author': ['auth']},
+            {'text': 'Пост с группой-числом', 'author': 'auth', 'group': 1},
+            {'text': 'Правильный пост', 'author': 'auth'},
+        ]
+        path = self.write('posts.jsonl', '\n'.join(
+            json.dumps(record) for record in records))
+        _, errors = self.import_posts(path)
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)),
+            ['Правильный пост'])
+        for line in range(1, 5):
+            self.assertIn(f'Запись {line}:', errors)
+
+    def test_import_does_not_touch_pub_date_field(self):
+        """Посты, которые сохраняются во время импорта, получают дату
+        публикации как обычно."""
+        path = self.write('posts.jsonl', json.dumps(
+            {'text': 'Импортированный пост', 'author': 'auth',
+             'pub_date': '2015-01-02T03:04:05'}))
+        saved = []
+
+        def add_counts(counts):
+            saved.append(Post.objects.create(
+                text='Пост во время импорта', author=self.user))
+            add_author_posts_counts(counts)
+
+        with mock.patch('posts.bulk.add_author_posts_counts', add_counts):
+            self.import_posts(path)
+        self.assertIsNotNone(saved[0].pub_date)
+        self.assertEqual(
+            Post.objects.get(text='Импортированный пост').pub_date.year, 2015)
+
+    def test_import_csv_creates_authors(self):
+        path = self.write(
+            'posts.csv',
+            'text,author,group\n'
+            'Пост из CSV-файла,new-author,test-slug\n',
+        )
+        self.import_posts(path, '--create-authors')
+        post = Post.objects.get()
+        self.assertEqual(post.author.username, 'new-author')
+        self.assertFalse(post.author.has_usable_password())
+
+    def test_import_resumes_from_checkpoint(self):
+        path = self.write('posts.jsonl', '\n'.join(json.dumps(
+            {'text': f'Импортированный пост {i}', 'author': 'auth'})
+            for i in range(5)))
+        ImportCheckpoint.objects.create(source=path, records=3)
+        self.import_posts(path)
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            ['Импортированный пост 3', 'Импортированный пост 4'],
+        )
+
+    def test_checkpoint_is_committed_with_chunk(self):
+        """Пачка, на которой импорт упал, откатывается вместе с
+        контрольной точкой, и повторный запуск не создаёт дублей."""
+        path = self.write('posts.jsonl', '\n'.join(json.dumps(
+            {'text': f'Импортированный пост {i}', 'author': 'auth'})
+            for i in range(5)))
+        chunks = []
+
+        def add_counts(counts):
+            chunks.append(counts)
+            add_author_posts_counts(counts)
+            if len(chunks) == 2:
+                raise RuntimeError('Импорт прерван')
+
+        with mock.patch('posts.bulk.add_author_posts_counts', add_counts):
+            with self.assertRaises(RuntimeError):
+                self.import_posts(path, '--chunk-size', '2')
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(ImportCheckpoint.objects.get().records, 2)
+        self.import_posts(path, '--chunk-size', '2')
+        self.assertEqual(
+            sorted(Post.objects.values_list('text', flat=True)),
+            [f'Импортированный пост {i}' for i in range(5)],
+        )
+
+
+class ExportPostsCommandTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.posts = [
+            Post.objects.create(author=cls.user, text=f'Текст поста {i}')
+            for i in range(5)
+        ]
+
+    def export(self, *args):
+        with tempfile.NamedTemporaryFile(suffix='.out') as output:
+            call_command('export_posts', *args, '--output', output.name,
+                         stderr=StringIO())
+            return output.read()
+
+    def test_export_to_text_stdout(self):
+        """stdout из call_command получает выгрузку, даже если у него нет
+        двоичного buffer."""
+        stdout = StringIO()
+        call_command('export_posts', 'posts', '--chunk-size', '2',
+                     stdout=stdout, stderr=StringIO())
+        rows = [json.loads(line) for line in stdout.getvalue().splitlines()]
+        self.assertEqual([row['text'] for row in rows],
+                         [post.text for post in self.posts])
+        with self.assertRaises(CommandError):
+            call_command('export_posts', 'posts', '--gzip',
+                         stdout=StringIO(), stderr=StringIO())
+
+    def test_export_jsonl_in_chunks(self):
+        rows = [json.loads(line) for line in self.export(
+            'posts', '--chunk-size', '2').decode().splitlines()]
+        self.assertEqual([row['id'] for row in rows],
+                         [post.id for post in self.posts])
+
+    def test_export_incremental_gzip_csv(self):
+        data = gzip.decompress(self.export(
+            'posts', '--format', 'csv', '--gzip',
+            '--since-id', str(self.posts[2].id)))
+        rows = list(csv.DictReader(io.StringIO(data.decode())))
+        self.assertEqual([int(row['id']) for row in rows],
+                         [post.id for post in self.posts[3:]])
+
+    def test_invalid_since_date(self):
+        for since_date in ('вчера', '2020-13-01T00:00:00'):
+            with self.subTest(since_date=since_date):
+                with self.assertRaises(CommandError):
+                    self.export('posts', '--since-date', since_date)
+
+
+class SeedCommandTest(TestCase):
+    def seed(self, *args):
+        call_command('seed', '--posts', '1000', '--users', '10',
+                     '--groups', '3', '--batch-size', '300', *args,
+                     stdout=StringIO())
+        return list(Post.objects.order_by('pub_date').values_list(
+            'text', 'pub_date', 'author__username', 'group__slug'))
+
+    def test_seed_is_deterministic(self):
+        posts = self.seed()
+        Post.objects.all().delete()
+        self.assertEqual(self.seed(), posts)
+
+    def test_seeded_data(self):
+        posts = self.seed('--years', '2')
+        self.assertGreater((posts[-1][1] - posts[0][1]).days, 700)
+        counts = list(User.objects.annotate(total=Count('posts')).order_by(
+            'pk').values_list('total', flat=True))
+        self.assertEqual(sum(counts), 1000)
+        self.assertGreater(counts[0], 2 * counts[-1])
+        call_command('recount_posts', '--check', stdout=StringIO())
+        self.assertGreater(SearchResults(posts[0][0]).count(), 0)
+
+
+class BenchmarkCommandTest(TestCase):
+    def run_benchmark(self, *args):
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            call_command('benchmark', '--no-isolate', '--posts', '30',
+                         '--repeats', '1', '--output', output.name, *args,
+                         stdout=StringIO(), stderr=StringIO())
+            return json.load(output)
+
+    def test_every_route_is_measured(self):
+        result = self.run_benchmark()
+        measured = {key.split()[0] for key in result['routes']}
+        for module in (posts_urls, users_urls, about_urls):
+            for pattern in module.urlpatterns:
+                name = f'{module.app_name}:{pattern.name}'
+                with self.subTest(name=name):
+                    self.assertIn(name, measured)
+        route = result['routes']['posts:index cursor=last']
+        self.assertEqual(route['status'], 200)
+        self.assertLessEqual(route['p50_ms'], route['p99_ms'])
+
+    def test_dataset_is_replaced_without_signals(self):
+        ensure_dataset(30)
+        deleted = mock.Mock()
+        post_delete.connect(deleted, sender=Post)
+        self.addCleanup(post_delete.disconnect, deleted, sender=Post)
+        self.assertTrue(ensure_dataset(40))
+        deleted.assert_not_called()
+        self.assertEqual(Post.objects.count(), 40)
+        call_command('recount_posts', '--check', stdout=StringIO())
+        text = Post.objects.first().text
+        self.assertEqual(SearchResults(text).count(),
+                         Post.objects.filter(text=text).count())
+
+    def test_regression_against_baseline(self):
+        baseline = self.run_benchmark('--only', 'about:tech')
+        baseline['routes']['about:tech']['p50_ms'] = 0
+        with tempfile.NamedTemporaryFile('w', suffix='.json') as file:
+            json.dump(baseline, file)
+            file.flush()
+            with self.assertRaises(CommandError):
+                self.run_benchmark('--only', 'about:tech', '--baseline',
+                                   file.name, '--fail-on-regression')
+
+
+class LoadTestCommandTest(TransactionTestCase):
+    def test_mixed_load(self):
+        seed_posts(100, authors=5, groups=2)
+        stdout = StringIO()
+        # Тестовая база в памяти с общим кэшем отвечает «locked» без
+        # ожидания busy_timeout, поэтому точные проверки — в один поток.
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            call_command('loadtest', '--no-isolate', '--threads', '1',
+                         '--requests', '40', '--writers', '2',
+                         '--output', output.name, stdout=stdout)
+            report = json.load(output)
+        self.assertEqual(report['requests'], 40)
+        self.assertEqual(report['locked_rate'], 0)
+        created = report['operations'].get('post_create', {'requests': 0})
+        self.assertEqual(Post.objects.count(), 100 + created['requests'])
+        for operation, result in report['operations'].items():
+            with self.subTest(operation=operation):
+                self.assertEqual(result['errors'], {})
+                self.assertEqual(sum(result['histogram'].values()),
+                                 result['requests'])
+
+    def test_compare_with_stock_sqlite(self):
+        seed_posts(100, authors=5, groups=2)
+        with tempfile.NamedTemporaryFile(suffix='.json') as output:
+            call_command('loadtest', '--no-isolate', '--threads', '2',
+                         '--requests', '5', '--sqlite', 'both',
+                         '--output', output.name, stdout=StringIO())
+            report = json.load(output)
+        self.assertEqual(set(report), {'stock', 'tuned', 'speedup'})
+        self.assertIn('total', report['speedup'])
+
+    def test_bad_mix(self):
+        with self.assertRaises(CommandError):
+            call_command('loadtest', '--no-isolate', '--mix', 'delete=1')
+
+
+class RebuildThumbnailsCommandTest(TestCase):
+    def test_rebuilds_missing_thumbnails(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        author = User.objects.create_user(username='author')
+        with override_settings(MEDIA_ROOT=directory.name):
+            image = io.BytesIO()
+            Image.new('RGB', (1200, 600)).save(image, 'PNG')
+            posts = [
+                Post.objects.create(
+                    text='Пост с картинкой', author=author,
+                    image=SimpleUploadedFile(f'{number}.png',
+                                             image.getvalue()))
+                for number in range(3)
+            ]
+            Post.objects.create(text='Пост без картинки', author=author)
+            out = StringIO()
+            call_command('rebuild_thumbnails', '--missing', '--workers', '1',
+                         '--batch-size', '2', stdout=out)
+        self.assertIn('Обработано постов: 2 из 3.', out.getvalue())
+        self.assertIn('Миниатюры построены для 3 постов.', out.getvalue())
+        for post in posts:
+            post.refresh_from_db()
+            self.assertEqual(post.get_thumbnails()['detail']['width'], 960)
@@ -1,12 +1,26 @@
-from django.test import Client, TestCase
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from http import HTTPStatus
 
+from core.models import Job
+
 from ..models import Post, Group
 
 User = get_user_model()
 
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
 
 class PostFormTests(TestCase):
     @classmethod
@@ -86,3 +100,18 @@ class PostFormTests(TestCase):
             'text',
             'Текст публикации не может быть короче 10 символов.'
         )
+
+    def test_create_post_with_image(self):
+        with tempfile.TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root):
+            self.authorized_client.post(self.url_post_create, data={
+                'text': 'Пост с картинкой',
+                'image': SimpleUploadedFile(
+                    'small.gif', SMALL_GIF, content_type='image/gif'),
+            })
+            post = Post.objects.get()
+            self.assertEqual(post.image.name, 'posts/small.gif')
+            self.assertEqual(post.thumbnails, '')
+            self.assertEqual(
+                list(Job.objects.values_list('queue', 'name')),
+                [('thumbnails', 'posts.tasks.make_thumbnails')])
@@ -1,8 +1,13 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db import connection
 from django.test import TestCase
 
 from .. import settings
-from ..models import Group, Post
+from ..models import AuthorStats, Group, Post
+from ..utils import CursorPaginator
 
 User = get_user_model()
 
@@ -87,3 +92,73 @@ class PostModelTest(TestCase):
             with self.subTest(value=value):
                 self.assertEqual(
                     group._meta.get_field(value).help_text, expected)
+
+
+class PostIndexesTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.test_group = Group.objects.create(
+            title='Тестовая группа 1',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.bulk_create([Post(
+            text='Тестовый текст' + str(i),
+            author=cls.user,
+            group=cls.test_group)
+            for i in range(settings.POSTS_PER_PAGE + 1)])
+
+    def test_feed_querysets_use_composite_indexes(self):
+        """Ленты index, group и profile читаются по составным индексам без
+        сортировки во временном B-дереве."""
+        feeds = {
+            'post_feed_idx': Post.objects.select_related('author', 'group'),
+            'post_group_feed_idx': self.test_group.posts.select_related(
+                'author'),
+            'post_author_feed_idx': self.user.posts.select_related('group'),
+        }
+        for index_name, posts in feeds.items():
+            paginator = CursorPaginator(posts, settings.POSTS_PER_PAGE)
+            sql, params = paginator.page(1).object_list.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                plan = ' '.join(row[-1] for row in cursor.fetchall())
+            with self.subTest(index_name=index_name):
+                self.assertIn(index_name, plan)
+                self.assertNotIn('TEMP B-TREE', plan)
+
+
+class AuthorStatsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+
+    def test_posts_count_follows_create_and_delete(self):
+        """Счётчик постов автора меняется при создании и удалении поста."""
+        posts = [
+            Post.objects.create(author=self.user, text='Тестовый текст')
+            for _ in range(3)
+        ]
+        self.assertEqual(self.user.stats.posts_count, 3)
+        posts[0].delete()
+        self.user.stats.refresh_from_db()
+        self.assertEqual(self.user.stats.posts_count, 2)
+
+    def test_author_cascade_delete(self):
+        """Каскадное удаление автора удаляет и его счётчик."""
+        Post.objects.create(author=self.user, text='Тестовый текст')
+        self.user.delete()
+        self.assertFalse(AuthorStats.objects.exists())
+
+    def test_recount_posts_command_repairs_drift(self):
+        """recount_posts находит и исправляет рассинхрон счётчиков."""
+        Post.objects.bulk_create([
+            Post(author=self.user, text='Тестовый текст') for _ in range(4)
+        ])
+        with self.assertRaises(CommandError):
+            call_command('recount_posts', '--check', stdout=StringIO())
+        call_command('recount_posts', stdout=StringIO())
+        self.assertEqual(AuthorStats.objects.get(author=self.user).posts_count,
+                         4)
+        call_command('recount_posts', '--check', stdout=StringIO())
@@ -1,5 +1,6 @@
 from django.test import TestCase, Client
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from http import HTTPStatus
 
 from ..models import Post, Group
@@ -38,6 +39,7 @@ class PostsURLTests(TestCase):
         cls.url_post_delete = '/posts/1/delete/'
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.user = User.objects.create_user(username='test-user')
         self.authorized_client = Client()
@@ -1,8 +1,31 @@
+import base64
+import gzip
+import os
+import subprocess
+import sys
+import tempfile
+from http import HTTPStatus
+from io import BytesIO, StringIO
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from django.utils.module_loading import import_string
+
+from unittest import mock
+
+from PIL import Image
+
+from core.jobs import Worker
 
+from .. import settings as posts_settings
 from ..models import Post, Group
+from ..utils import CursorPaginator, NumberedPaginator, posts_count_key
 
 User = get_user_model()
 
@@ -55,6 +78,7 @@ class PostsPagesTests(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.user = User.objects.create_user(username='test-user')
         self.authorized_client = Client()
@@ -151,6 +175,9 @@ class PaginatorViewsTestCase(TestCase):
             for i in range(13)]
         Post.objects.bulk_create(fixtures)
 
+    def setUp(self):
+        cache.clear()
+
     def test_first_pages_with_paginator_contains_ten_records(self):
         authorized_client = PaginatorViewsTestCase.authorized_client
         pages_tested = {
@@ -180,3 +207,788 @@ class PaginatorViewsTestCase(TestCase):
                     kwargs=kwargs
                 ) + '?page=2')
                 self.assertEqual(len(response.context['page_obj']), 3)
+
+
+class CursorPaginatorViewsTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create_user(
+            username='test-username',
+        )
+        Post.objects.bulk_create([Post(
+            text='Тестовый текст' + str(i),
+            author=cls.test_author)
+            for i in range(35)])
+        cls.url_index = reverse('posts:index')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    @mock.patch.object(posts_settings, 'POSTS_NUMBERED_PAGES', 1)
+    def test_cursor_pages_walk_whole_feed(self):
+        """Проход по курсорам после нумерованных страниц отдаёт все посты
+        ровно один раз и в том же порядке."""
+        expected = list(Post.objects.order_by(
+            '-pub_date', '-id').values_list('id', flat=True))
+        seen = []
+        query = 'page=1'
+        for _ in range(10):
+            response = self.guest_client.get(f'{self.url_index}?{query}')
+            page_obj = response.context['page_obj']
+            seen.extend(post.id for post in page_obj)
+            if not page_obj.has_next():
+                break
+            query = page_obj.next_page_query()
+        self.assertEqual(seen, expected)
+
+    @mock.patch.object(posts_settings, 'POSTS_NUMBERED_PAGES', 1)
+    def test_cursor_last_page(self):
+        """Курсор последней страницы отдаёт самые старые посты."""
+        response = self.guest_client.get(self.url_index + '?page=1')
+        query = response.context['page_obj'].last_page_query()
+        self.assertTrue(query.startswith('cursor='))
+        response = self.guest_client.get(f'{self.url_index}?{query}')
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), 10)
+        self.assertFalse(page_obj.has_next())
+        self.assertTrue(page_obj.has_previous())
+        self.assertEqual(
+            page_obj[len(page_obj) - 1].id,
+            Post.objects.order_by('pub_date', 'id').first().id,
+        )
+
+    def test_deep_pages_match_offset_pages(self):
+        """Страницы из второй половины, прочитанные с конца, совпадают с
+        обычной нарезкой ленты."""
+        expected = list(Post.objects.order_by(
+            '-pub_date', '-id').values_list('id', flat=True))
+        for number in (3, 4):
+            with self.subTest(number=number):
+                response = self.guest_client.get(
+                    f'{self.url_index}?page={number}')
+                self.assertEqual(
+                    [post.id for post in response.context['page_obj']],
+                    expected[(number - 1) * 10:number * 10],
+                )
+
+    def test_elided_page_range(self):
+        paginator = NumberedPaginator(Post.objects.order_by('id'), 1)
+        self.assertEqual(
+            list(paginator.get_elided_page_range(
+                18, on_each_side=2, on_ends=1)),
+            [1, '…', 16, 17, 18, 19, 20, '…', 35],
+        )
+        self.assertEqual(
+            list(paginator.get_elided_page_range(
+                2, on_each_side=2, on_ends=1)),
+            [1, 2, 3, 4, '…', 35],
+        )
+
+    def test_elided_page_range_stops_at_numbered_pages(self):
+        """Номера не выходят за первые POSTS_NUMBERED_PAGES страниц."""
+        paginator = CursorPaginator(Post.objects.all(), 1, numbered_pages=10)
+        self.assertEqual(
+            list(paginator.get_elided_page_range(
+                9, on_each_side=2, on_ends=1)),
+            [1, '…', 7, 8, 9, 10, '…'],
+        )
+
+    @mock.patch.object(posts_settings, 'POSTS_NUMBERED_PAGES', 2)
+    def test_deep_page_numbers_are_rejected(self):
+        """Глубже POSTS_NUMBERED_PAGES лента листается только курсором."""
+        response = self.guest_client.get(self.url_index + '?page=2')
+        self.assertTrue(response.context['page_obj'].next_page_query()
+                        .startswith('cursor='))
+        for number in (3, 4, 99):
+            with self.subTest(number=number):
+                response = self.guest_client.get(
+                    f'{self.url_index}?page={number}')
+                self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    @mock.patch.object(posts_settings, 'POSTS_NUMBERED_PAGES', 2)
+    def test_bad_page_numbers_fall_back(self):
+        """Неверный номер, как и раньше, ведёт на существующую страницу, а
+        не на 404, даже когда лента длиннее нумерованных страниц."""
+        fallbacks = {'0': 2, '-1': 2, 'abc': 1, '1.5': 1}
+        for number, expected in fallbacks.items():
+            with self.subTest(number=number):
+                response = self.guest_client.get(
+                    f'{self.url_index}?page={number}')
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(response.context['page_obj'].number,
+                                 expected)
+
+    @mock.patch.object(posts_settings, 'POSTS_PER_PAGE', 1)
+    @mock.patch.object(posts_settings, 'POSTS_NUMBERED_PAGES', 35)
+    def test_paginator_renders_constant_number_of_links(self):
+        response = self.guest_client.get(self.url_index + '?page=18')
+        self.assertContains(response, 'class="page-link" href="?page=',
+                            count=10)
+        self.assertContains(response, '…', count=2)
+
+    def test_broken_cursor_falls_back_to_first_page(self):
+        cursors = {
+            'garbage': '%%%',
+            'invalid date': base64.urlsafe_b64encode(
+                b'n|2020-13-01T00:00:00|1').decode(),
+            'past the end': base64.urlsafe_b64encode(
+                b'n|2000-01-01T00:00:00+00:00|1').decode(),
+        }
+        urls = (
+            self.url_index,
+            reverse('posts:profile', kwargs={'username': 'test-username'}),
+        )
+        for url in urls:
+            for name, cursor in cursors.items():
+                with self.subTest(url=url, cursor=name):
+                    response = self.guest_client.get(
+                        url, {'cursor': cursor})
+                    self.assertEqual(response.context['page_obj'].number, 1)
+
+
+class PostsCountCacheTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create_user(
+            username='test-username',
+        )
+        cls.test_group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.url_index = reverse('posts:index')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_count_is_cached_per_scope(self):
+        """COUNT(*) ленты выполняется один раз и попадает в кэш."""
+        Post.objects.create(text='Тестовый текст', author=self.test_author,
+                            group=self.test_group)
+        self.guest_client.get(self.url_index)
+        self.assertEqual(cache.get(posts_count_key('all')), 1)
+        self.guest_client.get(reverse(
+            'posts:group', kwargs={'slug': 'test-slug'}))
+        self.assertEqual(
+            cache.get(posts_count_key('group', self.test_group.pk)), 1)
+
+    def test_count_invalidated_on_create_edit_and_delete(self):
+        """Счётчики сбрасываются при создании, смене группы и удалении."""
+        post = Post.objects.create(text='Тестовый текст',
+                                   author=self.test_author)
+        keys = (
+            posts_count_key('all'),
+            posts_count_key('author', self.test_author.pk),
+            posts_count_key('group', self.test_group.pk),
+        )
+        cache.set_many({key: 100 for key in keys})
+        post.group = self.test_group
+        post.save()
+        self.assertIsNone(cache.get(keys[2]))
+        self.assertEqual(cache.get(keys[0]), 100)
+        post.delete()
+        self.assertEqual(cache.get_many(keys), {})
+
+    def test_paginator_renders_cached_num_pages(self):
+        cache.set(posts_count_key('all'), 95)
+        response = self.guest_client.get(self.url_index)
+        self.assertEqual(response.context['page_obj'].paginator.num_pages,
+                         10)
+
+
+class AnonymousPageCacheTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create_user(
+            username='test-username',
+        )
+        cls.test_group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other-slug',
+            description='Тестовое описание',
+        )
+        cls.url_index = reverse('posts:index')
+        cls.url_group = reverse('posts:group', kwargs={'slug': 'test-slug'})
+        cls.url_other_group = reverse(
+            'posts:group', kwargs={'slug': 'other-slug'})
+        cls.url_profile = reverse(
+            'posts:profile', kwargs={'username': 'test-username'})
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.test_author)
+        self.post = Post.objects.create(
+            text='Тестовый текст',
+            author=self.test_author,
+            group=self.test_group,
+        )
+        self.url_post_details = reverse(
+            'posts:post_details', kwargs={'post_id': self.post.id})
+
+    def assertCached(self, url, cached=True):
+        response = self.guest_client.get(url)
+        if cached:
+            self.assertIsNone(response.context)
+        else:
+            self.assertIsNotNone(response.context)
+        return response
+
+    def test_anonymous_pages_served_from_cache(self):
+        """Повторный анонимный запрос отдаётся из кэша без рендеринга."""
+        urls = (self.url_index, self.url_group, self.url_profile,
+                self.url_post_details)
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.assertCached(url, cached=False)
+                second = self.assertCached(url)
+                self.assertEqual(first.content, second.content)
+
+    def test_authorized_pages_not_cached(self):
+        self.guest_client.get(self.url_index)
+        response = self.authorized_client.get(self.url_index)
+        self.assertIsNotNone(response.context)
+
+    def test_page_number_is_part_of_key(self):
+        self.guest_client.get(self.url_index)
+        self.assertCached(self.url_index + '?page=2', cached=False)
+
+    def test_edit_invalidates_only_affected_pages(self):
+        """Перенос поста в другую группу сбрасывает страницы поста, автора,
+        обеих групп и ленты, но не чужие страницы."""
+        User.objects.create_user(username='other-username')
+        url_other_profile = reverse(
+            'posts:profile', kwargs={'username': 'other-username'})
+        urls = (self.url_index, self.url_group, self.url_other_group,
+                self.url_profile, self.url_post_details, url_other_profile)
+        for url in urls:
+            self.guest_client.get(url)
+        self.authorized_client.post(
+            reverse('posts:post_update', kwargs={'post_id': self.post.id}),
+            data={'text': 'Изменённый текст', 'group': self.other_group.id},
+        )
+        for url in urls[:-1]:
+            with self.subTest(url=url):
+                self.assertCached(url, cached=False)
+        self.assertCached(url_other_profile)
+
+    def test_create_and_delete_invalidate_pages(self):
+        urls = (self.url_index, self.url_group, self.url_profile,
+                self.url_post_details)
+        for url in urls:
+            self.guest_client.get(url)
+        Post.objects.create(text='Новый пост', author=self.test_author)
+        for url in (self.url_index, self.url_profile, self.url_post_details):
+            with self.subTest(url=url):
+                self.assertCached(url, cached=False)
+        self.assertCached(self.url_group)
+        self.post.delete()
+        response = self.guest_client.get(self.url_group)
+        self.assertNotContains(response, 'Тестовый текст')
+
+    def test_group_description_edit_invalidates_group_page(self):
+        self.guest_client.get(self.url_index)
+        self.guest_client.get(self.url_group)
+        group = Group.objects.get(pk=self.test_group.pk)
+        group.description = 'Новое описание'
+        group.save()
+        response = self.assertCached(self.url_group, cached=False)
+        self.assertContains(response, 'Новое описание')
+        self.assertCached(self.url_index)
+
+    def test_invalidation_reaches_other_processes(self):
+        """Версии областей лежат в общем кэше: сброс в другом процессе
+        (воркере, команде) виден серверу."""
+        self.guest_client.get(self.url_index)
+        etag = self.guest_client.get(self.url_index)['ETag']
+        subprocess.run(
+            [sys.executable, '-c',
+             'import django; django.setup(); '
+             'from posts.page_cache import invalidate_scopes; '
+             'invalidate_scopes("index")'],
+            cwd=settings.BASE_DIR, check=True,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'yatube.settings'},
+        )
+        response = self.assertCached(self.url_index, cached=False)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class PostCardCacheTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create_user(
+            username='test-username',
+        )
+        cls.url_index = reverse('posts:index')
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.test_author)
+        self.test_group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        self.post = Post.objects.create(
+            text='Тестовый текст',
+            author=self.test_author,
+            group=self.test_group,
+        )
+
+    def test_card_is_cached_until_post_is_saved(self):
+        """Карточка поста берётся из кэша, пока не изменится updated."""
+        self.authorized_client.get(self.url_index)
+        Post.objects.filter(pk=self.post.pk).update(text='Без сохранения')
+        response = self.authorized_client.get(self.url_index)
+        self.assertContains(response, 'Тестовый текст')
+        self.post.text = 'Изменённый текст'
+        self.post.save()
+        response = self.authorized_client.get(self.url_index)
+        self.assertContains(response, 'Изменённый текст')
+
+    def test_group_and_author_rename_refresh_cards(self):
+        self.authorized_client.get(self.url_index)
+        self.test_group.title = 'Новое название'
+        self.test_group.save()
+        self.test_author.first_name = 'Лев'
+        self.test_author.save()
+        Worker(pool='sync').run(burst=True)
+        response = self.authorized_client.get(self.url_index)
+        self.assertContains(response, 'Новое название')
+        self.assertContains(response, 'Лев')
+
+    def test_group_delete_refreshes_cards_and_pages(self):
+        """Удаление группы обнуляет group у постов через SET_NULL, минуя
+        save(), но ссылка на неё пропадает и из карточек, и из кэша
+        страниц."""
+        url_group = reverse('posts:group', kwargs={'slug': 'test-slug'})
+        urls = (
+            self.url_index,
+            reverse('posts:profile', kwargs={'username': 'test-username'}),
+            reverse('posts:post_details', kwargs={'post_id': self.post.pk}),
+        )
+        guest_client = Client()
+        self.authorized_client.get(self.url_index)
+        for url in urls:
+            guest_client.get(url)
+        self.test_group.delete()
+        response = self.authorized_client.get(self.url_index)
+        self.assertNotContains(response, url_group)
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertNotContains(guest_client.get(url), url_group)
+
+    def test_rename_invalidates_anonymous_pages(self):
+        """Страница автора сбрасывается сразу, а страницы с его постами —
+        задачей, которую воркер выполняет в другом процессе со своим
+        экземпляром кэша."""
+        url_group = reverse('posts:group', kwargs={'slug': 'test-slug'})
+        url_profile = reverse(
+            'posts:profile', kwargs={'username': 'test-username'})
+        guest_client = Client()
+        guest_client.get(url_group)
+        guest_client.get(url_profile)
+        self.test_author.first_name = 'Лев'
+        self.test_author.save()
+        self.assertContains(guest_client.get(url_profile), 'Лев')
+        config = settings.CACHES['default']
+        worker_cache = import_string(config['BACKEND'])(
+            config['LOCATION'], config)
+        with mock.patch('posts.page_cache.cache', worker_cache):
+            Worker(pool='sync').run(burst=True)
+        response = guest_client.get(url_group)
+        self.assertContains(response, 'Лев')
+
+
+class SearchViewsTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create_user(
+            username='test-username',
+        )
+        cls.admin_client = Client()
+        cls.admin_client.force_login(User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'))
+        cls.url_search = reverse('posts:search')
+
+    def setUp(self):
+        self.guest_client = Client()
+        self.post_cats = Post.objects.create(
+            text='Коты спят на подоконнике', author=self.test_author)
+        self.post_dogs = Post.objects.create(
+            text='Собаки гуляют, коты спят', author=self.test_author)
+        Post.objects.create(text='Совсем другой текст',
+                            author=self.test_author)
+
+    def search(self, query):
+        response = self.guest_client.get(self.url_search, {'q': query})
+        return [post.id for post in response.context['page_obj']]
+
+    def test_search_finds_matching_posts(self):
+        self.assertCountEqual(self.search('коты спят'),
+                              [self.post_cats.id, self.post_dogs.id])
+        self.assertEqual(self.search('подоконнике'), [self.post_cats.id])
+
+    def test_index_follows_edit_and_delete(self):
+        """Индекс FTS5 обновляется при изменении и удалении поста."""
+        self.post_cats.text = 'Хомяки бегают в колесе'
+        self.post_cats.save()
+        self.assertEqual(self.search('подоконнике'), [])
+        self.assertEqual(self.search('хомяки'), [self.post_cats.id])
+        self.post_cats.delete()
+        self.assertEqual(self.search('хомяки'), [])
+
+    def test_query_syntax_is_escaped(self):
+        for query in ('"', 'коты OR', 'NEAR(', '*', ''):
+            with self.subTest(query=query):
+                response = self.guest_client.get(self.url_search,
+                                                 {'q': query})
+                self.assertEqual(response.status_code, 200)
+
+    def test_page_links_keep_query(self):
+        Post.objects.bulk_create([
+            Post(text=f'Коты номер {i}', author=self.test_author)
+            for i in range(20)
+        ])
+        response = self.guest_client.get(self.url_search, {'q': 'коты'})
+        self.assertContains(response, '?q=%D0%BA%D0%BE%D1%82%D1%8B&amp;page=2')
+
+    def test_admin_search_uses_index(self):
+        response = self.admin_client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'подоконнике'})
+        self.assertEqual(
+            [post.id for post in response.context['cl'].result_list],
+            [self.post_cats.id],
+        )
+
+    def test_rebuild_search_index_command(self):
+        call_command('rebuild_search_index', '--optimize', stdout=StringIO())
+        self.assertEqual(self.search('подоконнике'), [self.post_cats.id])
+
+
+class ConditionalGetTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create_user(
+            username='test-username',
+        )
+        cls.test_group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.post = Post.objects.create(
+            text='Тестовый текст',
+            author=self.test_author,
+            group=self.test_group,
+        )
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'test-username'}),
+            reverse('posts:post_details', kwargs={'post_id': self.post.id}),
+        )
+
+    def test_unchanged_pages_return_not_modified(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertTrue(response.has_header('ETag'))
+                self.assertTrue(response.has_header('Last-Modified'))
+                revalidated = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(revalidated.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+                revalidated = self.guest_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEqual(revalidated.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+
+    def test_edit_changes_validators(self):
+        etags = [self.guest_client.get(url)['ETag'] for url in self.urls]
+        self.post.text = 'Изменённый текст'
+        self.post.save()
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_etag_differs_for_logged_in_user(self):
+        etag = self.guest_client.get(self.urls[0])['ETag']
+        authorized_client = Client()
+        authorized_client.force_login(self.test_author)
+        response = authorized_client.get(self.urls[0],
+                                         HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+class FeedsTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create_user(
+            username='test-username',
+        )
+        cls.test_group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.urls = (
+            reverse('posts:index_feed'),
+            reverse('posts:group_feed', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile_feed',
+                    kwargs={'username': 'test-username'}),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        Post.objects.create(text='Тестовый <текст> & ко',
+                            author=self.test_author, group=self.test_group)
+
+    def test_feeds_are_streamed_and_escaped(self):
+        for url in self.urls:
+            for feed_format, root in (('atom', '<feed'), ('rss', '<rss')):
+                with self.subTest(url=url, feed_format=feed_format):
+                    response = self.guest_client.get(
+                        url, {'format': feed_format})
+                    self.assertTrue(response.streaming)
+                    content = b''.join(response.streaming_content).decode()
+                    self.assertIn(root, content)
+                    self.assertIn('Тестовый &lt;текст&gt; &amp; ко', content)
+                    self.assertTrue(response.has_header('Last-Modified'))
+
+    def test_feed_revalidation(self):
+        response = self.guest_client.get(self.urls[0])
+        response = self.guest_client.get(
+            self.urls[0], HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        etag = self.guest_client.get(self.urls[0], {'format': 'rss'})['ETag']
+        Post.objects.create(text='Новый пост', author=self.test_author)
+        response = self.guest_client.get(
+            self.urls[0], {'format': 'rss'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_feed_size_is_limited(self):
+        with mock.patch.object(posts_settings, 'POSTS_FEED_SIZE', 1):
+            Post.objects.create(text='Ещё один пост', author=self.test_author)
+            response = self.guest_client.get(self.urls[0])
+            content = b''.join(response.streaming_content).decode()
+        self.assertEqual(content.count('<entry>'), 1)
+
+
+class ExportViewTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create_user(username='test-username')
+        cls.staff_client = Client()
+        cls.staff_client.force_login(User.objects.create_user(
+            username='staff', is_staff=True))
+        Post.objects.create(text='Тестовый текст', author=cls.test_author)
+        cls.url_export = reverse('posts:export', kwargs={'table': 'posts'})
+
+    def test_export_is_staff_only(self):
+        authorized_client = Client()
+        authorized_client.force_login(self.test_author)
+        response = authorized_client.get(self.url_export)
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+    def test_staff_export_is_streamed(self):
+        response = self.staff_client.get(self.url_export,
+                                         {'format': 'csv', 'gzip': ''})
+        self.assertTrue(response.streaming)
+        data = gzip.decompress(b''.join(response.streaming_content))
+        self.assertIn('Тестовый текст', data.decode())
+
+    def test_bad_parameters(self):
+        for params in ({'format': 'xml'}, {'since_id': 'x'},
+                       {'since_date': 'вчера'},
+                       {'since_date': '2020-13-01T00:00:00'}):
+            with self.subTest(params=params):
+                response = self.staff_client.get(self.url_export, params)
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.BAD_REQUEST)
+
+
+class ApiViewsTestCase(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_author = User.objects.create_user(username='test-username')
+        cls.test_group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Тестовый текст {number}',
+                author=cls.test_author,
+                group=cls.test_group,
+            ) for number in range(3)
+        ]
+        cls.url_api_index = reverse('posts:api_index')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_cursor_walks_all_posts(self):
+        ids = []
+        url = self.url_api_index
+        params = {'limit': 2, 'fields': 'id'}
+        while url:
+            data = self.guest_client.get(url, params).json()
+            ids.extend(post['id'] for post in data['results'])
+            self.assertEqual(
+                {key for post in data['results'] for key in post}, {'id'})
+            url, params = data['next'], None
+        self.assertEqual(ids, [post.id for post in reversed(self.posts)])
+
+    def test_scoped_feeds_and_post(self):
+        urls = (
+            reverse('posts:api_group', kwargs={'slug': 'test-slug'}),
+            reverse('posts:api_profile',
+                    kwargs={'username': 'test-username'}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                results = self.guest_client.get(url).json()['results']
+                self.assertEqual(len(results), len(self.posts))
+                self.assertEqual(results[0]['author'], 'test-username')
+                self.assertEqual(results[0]['group'], 'test-slug')
+        post = self.posts[0]
+        response = self.guest_client.get(
+            reverse('posts:api_post', kwargs={'post_id': post.id}),
+            {'fields': 'text'})
+        self.assertEqual(response.json()['text'], post.text)
+        self.assertNotIn('id', response.json())
+        self.assertTrue(response.has_header('ETag'))
+
+    def test_bad_requests(self):
+        for params in ({'fields': 'password'}, {'limit': 0},
+                       {'limit': posts_settings.POSTS_API_LIMIT + 1},
+                       {'cursor': 'битый'},
+                       {'cursor': base64.urlsafe_b64encode(
+                           b'n|2020-13-01T00:00:00|1').decode()}):
+            with self.subTest(params=params):
+                response = self.guest_client.get(self.url_api_index, params)
+                self.assertEqual(response.status_code,
+                                 HTTPStatus.BAD_REQUEST)
+                self.assertIn('error', response.json())
+        response = self.guest_client.get(
+            reverse('posts:api_post', kwargs={'post_id': 0}))
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_unchanged_feed_returns_not_modified(self):
+        etag = self.guest_client.get(self.url_api_index)['ETag']
+        response = self.guest_client.get(self.url_api_index,
+                                         HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        response = self.guest_client.get(self.url_api_index,
+                                         {'fields': 'id'},
+                                         HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+
+def jpeg_image(width, height):
+    output = BytesIO()
+    Image.new('RGB', (width, height), 'teal').save(output, 'JPEG')
+    return output.getvalue()
+
+
+class ThumbnailViewsTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        media = override_settings(MEDIA_ROOT=directory.name)
+        media.enable()
+        self.addCleanup(media.disable)
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=User.objects.create_user(username='test-username'),
+            group=Group.objects.create(title='Тестовая группа',
+                                       slug='test-slug'),
+            image=SimpleUploadedFile('photo.jpg', jpeg_image(2000, 1000)),
+        )
+        self.url_index = reverse('posts:index')
+
+    def test_thumbnails_are_built_off_request_path(self):
+        response = self.client.get(self.url_index)
+        self.assertNotContains(response, 'card-img')
+        Worker(['thumbnails'], pool='sync').run(burst=True)
+        self.post.refresh_from_db()
+        thumbnails = self.post.get_thumbnails()
+        self.assertEqual(
+            {name: (size['width'], size['height'])
+             for name, size in thumbnails.items()},
+            {'feed': (960, 339), 'feed_2x': (1920, 678),
+             'detail': (960, 480), 'detail_2x': (1920, 960)},
+        )
+        feeds = (
+            self.url_index,
+            reverse('posts:group', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'test-username'}),
+        )
+        for url in feeds:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, thumbnails['feed']['url'])
+                self.assertContains(response, 'width="960" height="339"')
+        # Страницы группы и автора сохраняют свою разметку карточки.
+        detail_link = '<a href="{}">Подробная информация</a>'.format(
+            reverse('posts:post_details', args=[self.post.pk]))
+        for url in feeds[1:]:
+            with self.subTest(url=url):
+                self.assertContains(self.client.get(url), detail_link,
+                                    html=True)
+        response = self.client.get(
+            reverse('posts:post_details', args=[self.post.pk]))
+        self.assertContains(response, thumbnails['detail_2x']['url'])
+
+    def test_feed_does_not_resize_or_touch_storage(self):
+        Worker(['thumbnails'], pool='sync').run(burst=True)
+        cache.clear()
+        with mock.patch('posts.tasks.get_thumbnail') as get_thumbnail, \
+                mock.patch.object(FileSystemStorage, 'exists') as exists, \
+                mock.patch.object(FileSystemStorage, 'size') as size:
+            response = self.client.get(self.url_index)
+        self.assertContains(response, 'card-img')
+        get_thumbnail.assert_not_called()
+        exists.assert_not_called()
+        size.assert_not_called()
+
+    def test_replaced_image_drops_old_thumbnails(self):
+        Worker(['thumbnails'], pool='sync').run(burst=True)
+        self.post.refresh_from_db()
+        old_image = self.post.image.path
+        self.post.image = SimpleUploadedFile('new.jpg', jpeg_image(800, 800))
+        self.post.save()
+        self.assertEqual(self.post.get_thumbnails(), {})
+        Worker(['thumbnails'], pool='sync').run(burst=True)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.get_thumbnails()['detail']['width'], 800)
+        self.assertFalse(os.path.exists(old_image))
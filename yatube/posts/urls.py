@@ -1,16 +1,27 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 
 app_name = 'posts'
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('feed/', views.index_feed, name='index_feed'),
     path('group/<slug:slug>/', views.group, name='group'),
+    path('group/<slug:slug>/feed/', views.group_feed, name='group_feed'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('profile/<str:username>/feed/', views.profile_feed,
+         name='profile_feed'),
     path('posts/<int:post_id>/', views.post_detail, name='post_details'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_update'),
+    path('search/', views.search, name='search'),
+    path('export/<str:table>/', views.export_table, name='export'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/delete/', views.post_delete, name='post_delete'),
+    path('api/posts/', api.index, name='api_index'),
+    path('api/posts/<int:post_id>/', api.post_detail, name='api_post'),
+    path('api/group/<slug:slug>/posts/', api.group, name='api_group'),
+    path('api/profile/<str:username>/posts/', api.profile,
+         name='api_profile'),
 ]
@@ -1,9 +1,361 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+
+from django.core.cache import cache
+from django.core.paginator import (EmptyPage, InvalidPage, Page,
+                                   PageNotAnInteger, Paginator)
+from django.db.models import Count, F, Q
+from django.http import Http404
+from django.utils.dateparse import parse_datetime
+from django.utils import timezone
+from django.utils.functional import cached_property
+from django.utils.http import urlencode
 
 from . import settings
+from .models import AuthorStats, Post
+
+
+FORWARD = 'n'
+BACKWARD = 'p'
+
+
+class DeepPage(InvalidPage):
+    """Номер страницы глубже тех, что CursorPaginator отдаёт по номеру."""
+
+
+def posts_count_key(scope, pk=None):
+    """Ключ кэша счётчика постов: всех, группы или автора."""
+    if pk is None:
+        return f'posts:count:{scope}'
+    return f'posts:count:{scope}:{pk}'
+
+
+def invalidate_posts_count(author_id=None, group_id=None):
+    keys = [posts_count_key('all')]
+    if author_id is not None:
+        keys.append(posts_count_key('author', author_id))
+    if group_id is not None:
+        keys.append(posts_count_key('group', group_id))
+    cache.delete_many(keys)
+
+
+def encode_cursor(direction, post=None):
+    """Курсор: направление обхода и ключ (pub_date, id) опорного поста.
+    post — объект Post или строка из .values() с pub_date и id."""
+    raw = direction
+    if isinstance(post, dict):
+        raw = f'{direction}|{post["pub_date"].isoformat()}|{post["id"]}'
+    elif post is not None:
+        raw = f'{direction}|{post.pub_date.isoformat()}|{post.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Возвращает (direction, pub_date, pk) или None для битого курсора."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    parts = raw.split('|')
+    if parts[0] not in (FORWARD, BACKWARD):
+        return None
+    if len(parts) == 1:
+        return parts[0], None, None
+    if len(parts) != 3 or not parts[2].isdigit():
+        return None
+    try:
+        pub_date = parse_datetime(parts[1])
+    except ValueError:
+        # Строка в формате даты, но с несуществующей датой.
+        return None
+    if pub_date is None:
+        return None
+    return parts[0], pub_date, int(parts[2])
+
+
+def change_author_posts_count(author_id, delta):
+    """Атомарно сдвигает хранимый счётчик постов автора на delta.
+
+    Строку счётчика создаём только при добавлении поста: при каскадном
+    удалении автора она уже может быть удалена вместе с ним.
+    """
+    updated = AuthorStats.objects.filter(author_id=author_id).update(
+        posts_count=F('posts_count') + delta)
+    if not updated and delta > 0:
+        get_author_posts_count(author_id)
+
+
+def get_author_posts_count(author_id):
+    """Хранимый счётчик постов автора; при отсутствии строки она
+    создаётся по фактическому COUNT(*)."""
+    stats, _ = AuthorStats.objects.get_or_create(
+        author_id=author_id,
+        defaults={
+            'posts_count': Post.objects.filter(author_id=author_id).count(),
+        },
+    )
+    return stats.posts_count
+
+
+def touch_posts(**filters):
+    """Сдвигает updated у постов одним UPDATE, чтобы их закэшированные
+    карточки перестали находиться по старому ключу."""
+    return Post.objects.filter(**filters).update(updated=timezone.now())
+
+
+def count_posts_by_author():
+    """Фактическое число постов для каждого автора одним запросом."""
+    rows = Post.objects.order_by().values('author').annotate(
+        total=Count('id'))
+    return {row['author']: row['total'] for row in rows}
+
+
+class NumberedPage(Page):
+    """Обычная страница с номером и ссылками для include paginator.html."""
+
+    def elided_page_range(self):
+        return self.paginator.get_elided_page_range(self.number)
+
+    def previous_page_query(self):
+        return self.paginator.query(page=self.previous_page_number())
+
+    def next_page_query(self):
+        return self.paginator.query(**self.paginator.next_page_params(self))
+
+    def last_page_query(self):
+        return self.paginator.query(**self.paginator.last_page_params())
+
+
+class CursorPage(Page):
+    """Страница, выбранная по ключу (pub_date, id) без OFFSET. Номера
+    у неё нет, поэтому number равен None."""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def previous_page_query(self):
+        return self.paginator.query(cursor=encode_cursor(BACKWARD, self[0]))
+
+    def next_page_query(self):
+        return self.paginator.query(
+            cursor=encode_cursor(FORWARD, self[len(self) - 1]))
+
+    def last_page_query(self):
+        return self.paginator.query(**self.paginator.last_page_params())
+
+    def start_index(self):
+        return None
+
+    def end_index(self):
+        return None
+
+
+class NumberedPaginator(Paginator):
+    """Paginator с окном номеров страниц. query_params — параметры
+    запроса (например, строка поиска), которые сохраняются в ссылках."""
+    ELLIPSIS = '…'
+
+    def __init__(self, object_list, per_page, query_params=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.query_params = query_params or {}
+
+    def _get_page(self, *args, **kwargs):
+        return NumberedPage(*args, **kwargs)
+
+    def query(self, **params):
+        return urlencode({**self.query_params, **params})
+
+    @property
+    def query_prefix(self):
+        if not self.query_params:
+            return ''
+        return urlencode(self.query_params) + '&'
+
+    @property
+    def last_numbered_page(self):
+        return self.num_pages
+
+    def next_page_params(self, page):
+        return {'page': page.next_page_number()}
+
+    def last_page_params(self):
+        return {'page': self.num_pages}
+
+    def get_elided_page_range(self, number=1, on_each_side=None,
+                              on_ends=None):
+        """Номера страниц вокруг текущей и по краям, пропуски заменены на
+        ELLIPSIS. Длина не зависит от общего числа страниц. Номера не
+        выходят за last_numbered_page; если дальше есть ещё страницы,
+        в конце стоит ELLIPSIS."""
+        if on_each_side is None:
+            on_each_side = settings.POSTS_PAGE_RANGE_ON_EACH_SIDE
+        if on_ends is None:
+            on_ends = settings.POSTS_PAGE_RANGE_ON_ENDS
+        number = self.validate_number(number)
+        num_pages = self.last_numbered_page
+        if num_pages <= (on_each_side + on_ends) * 2:
+            yield from range(1, num_pages + 1)
+        else:
+            if number > 1 + on_each_side + on_ends + 1:
+                yield from range(1, on_ends + 1)
+                yield self.ELLIPSIS
+                yield from range(number - on_each_side, number + 1)
+            else:
+                yield from range(1, number + 1)
+            if number < num_pages - on_each_side - on_ends - 1:
+                yield from range(number + 1, number + on_each_side + 1)
+                yield self.ELLIPSIS
+                yield from range(num_pages - on_ends + 1, num_pages + 1)
+            else:
+                yield from range(number + 1, num_pages + 1)
+        if num_pages < self.num_pages:
+            yield self.ELLIPSIS
+
+
+class CursorPaginator(NumberedPaginator):
+    """Paginator с поддержкой keyset-пагинации по (pub_date, id).
+
+    По номеру отдаются только первые numbered_pages страниц, дальше —
+    только по курсору: более глубокий ?page= вызывает DeepPage, так что
+    OFFSET не превышает numbered_pages * per_page при любой длине ленты.
+    Если передан count_key, COUNT(*) берётся из кэша и устаревает не
+    более чем на POSTS_COUNT_CACHE_TIMEOUT секунд.
+    """
+    ordering = ('-pub_date', '-id')
+
+    def __init__(self, object_list, per_page, numbered_pages=None,
+                 count_key=None, **kwargs):
+        super().__init__(
+            object_list.order_by(*self.ordering), per_page, **kwargs)
+        if numbered_pages is None:
+            numbered_pages = settings.POSTS_NUMBERED_PAGES
+        self.numbered_pages = numbered_pages
+        self.count_key = count_key
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            return super().count
+        count = cache.get(self.count_key)
+        if count is None:
+            count = super().count
+            cache.set(self.count_key, count,
+                      settings.POSTS_COUNT_CACHE_TIMEOUT)
+        return count
+
+    @property
+    def last_numbered_page(self):
+        return min(self.num_pages, self.numbered_pages)
+
+    def validate_number(self, number):
+        try:
+            number = super().validate_number(number)
+        except EmptyPage:
+            # Номер за концом длинной ленты тоже глубже numbered_pages.
+            if int(number) < 1 or self.num_pages <= self.numbered_pages:
+                raise
+            number = int(number)
+        if number > self.numbered_pages:
+            raise DeepPage('Эта страница доступна только по курсору.')
+        return number
+
+    def get_page(self, number):
+        """Как Paginator.get_page, но вместо последней страницы, которой
+        нет по номеру, отдаёт last_numbered_page. DeepPage для номера
+        глубже numbered_pages не перехватывается."""
+        try:
+            number = self.validate_number(number)
+        except PageNotAnInteger:
+            number = 1
+        except EmptyPage:
+            number = self.last_numbered_page
+        return self.page(number)
+
+    def next_page_params(self, page):
+        if page.number >= self.numbered_pages:
+            return {'cursor': encode_cursor(FORWARD, page[len(page) - 1])}
+        return super().next_page_params(page)
+
+    def last_page_params(self):
+        if self.num_pages > self.numbered_pages:
+            return {'cursor': encode_cursor(BACKWARD)}
+        return super().last_page_params()
+
+    def page(self, number):
+        """Страницы из второй половины ленты читаются с конца, в обратном
+        порядке: так OFFSET остаётся небольшим и для последних страниц."""
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        if bottom <= self.count // 2:
+            return super().page(number)
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        posts = list(
+            self.object_list.reverse()[self.count - top:self.count - bottom])
+        posts.reverse()
+        return self._get_page(posts, number, self)
+
+    def keyset_slice(self, direction=FORWARD, pub_date=None, pk=None):
+        """Не больше per_page постов после ключа (pub_date, id) в сторону
+        direction без COUNT и OFFSET. Возвращает (посты, есть_ещё)."""
+        posts = self.object_list
+        if direction == FORWARD:
+            if pub_date is not None:
+                posts = posts.filter(
+                    Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, id__lt=pk)
+                )
+        else:
+            posts = posts.reverse()
+            if pub_date is not None:
+                posts = posts.filter(
+                    Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, id__gt=pk)
+                )
+        posts = list(posts[:self.per_page + 1])
+        has_more = len(posts) > self.per_page
+        posts = posts[:self.per_page]
+        if direction == BACKWARD:
+            posts.reverse()
+        return posts, has_more
+
+    def get_cursor_page(self, cursor):
+        decoded = decode_cursor(cursor)
+        if decoded is None:
+            return self.get_page(1)
+        direction, pub_date, pk = decoded
+        if direction == FORWARD and pub_date is None:
+            return self.get_page(1)
+        posts, has_more = self.keyset_slice(direction, pub_date, pk)
+        if not posts:
+            # За курсором ничего нет (например, старая ссылка после
+            # удаления постов): ссылаться из пустой страницы не на что.
+            return self.get_page(1)
+        if direction == FORWARD:
+            return CursorPage(posts, self, has_next=has_more,
+                              has_previous=True)
+        return CursorPage(posts, self, has_next=pub_date is not None,
+                          has_previous=has_more)
 
 
-def paginate_page(request, page):
-    paginator = Paginator(page, settings.POSTS_PER_PAGE)
+def paginate_page(request, page, count_key=None):
+    paginator = CursorPaginator(page, settings.POSTS_PER_PAGE,
+                                count_key=count_key)
+    cursor = request.GET.get('cursor')
+    if cursor:
+        return paginator.get_cursor_page(cursor)
     page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+    try:
+        return paginator.get_page(page_number)
+    except DeepPage as error:
+        raise Http404(str(error))
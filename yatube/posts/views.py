@@ -1,24 +1,40 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 
-from .forms import PostForm
+from . import settings
+from .export import CONTENT_TYPES, EXPORTS, export, parse_since_date
+from .feeds import FEED_FORMATS
+from .forms import PostForm, PostImageForm
 from .models import Post, Group, User
-from .utils import paginate_page
+from .page_cache import (cache_anonymous_page, conditional_page,
+                         group_scopes, index_scopes, post_scopes,
+                         profile_scopes, resolve_scopes,
+                         scopes_last_modified)
+from .search import SearchResults
+from .utils import (NumberedPaginator, get_author_posts_count,
+                    paginate_page, posts_count_key)
 
 
+@conditional_page(index_scopes)
+@cache_anonymous_page(index_scopes)
 def index(request):
     posts = Post.objects.select_related('author', 'group')
-    page_obj = paginate_page(request, posts)
+    page_obj = paginate_page(request, posts, posts_count_key('all'))
     return render(request, 'posts/index.html', {
         'page_obj': page_obj,
     })
 
 
+@conditional_page(group_scopes)
+@cache_anonymous_page(group_scopes)
 def group(request, slug):
     group = get_object_or_404(Group, slug=slug)
     group_posts = group.posts.select_related('author')
-    page_obj = paginate_page(request, group_posts)
+    page_obj = paginate_page(request, group_posts,
+                             posts_count_key('group', group.pk))
     return render(request, 'posts/group_list.html', {
         'group': group,
         'posts': group_posts,
@@ -26,30 +42,88 @@ def group(request, slug):
     })
 
 
+@conditional_page(profile_scopes)
+@cache_anonymous_page(profile_scopes)
 def profile(request, username):
     author = get_object_or_404(User, username=username)
     post_list = author.posts.select_related('group')
-    page_obj = paginate_page(request, post_list)
+    page_obj = paginate_page(request, post_list,
+                             posts_count_key('author', author.pk))
     context = {
         'author': author,
         'page_obj': page_obj,
+        'posts_count': get_author_posts_count(author.pk),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_page(post_scopes)
+@cache_anonymous_page(post_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post.objects.select_related('group'), id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author', 'group'), id=post_id)
     context = {
         'post': post,
+        'posts_count': get_author_posts_count(post.author_id),
     }
     return render(request, 'posts/post_details.html', context)
 
 
+def feed_response(request, title, posts, scopes):
+    feed, content_type = FEED_FORMATS.get(
+        request.GET.get('format'), FEED_FORMATS['atom'])
+    updated = scopes_last_modified(scopes)
+    return StreamingHttpResponse(
+        feed(request, title, posts, updated), content_type=content_type)
+
+
+@conditional_page(index_scopes)
+def index_feed(request):
+    return feed_response(
+        request, 'Последние обновления на сайте', Post.objects.all(),
+        resolve_scopes(index_scopes, request),
+    )
+
+
+@conditional_page(group_scopes)
+def group_feed(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(
+        request, group.title, group.posts.all(),
+        resolve_scopes(group_scopes, request, slug),
+    )
+
+
+@conditional_page(profile_scopes)
+def profile_feed(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_response(
+        request, f'Публикации {author.get_full_name() or author.username}',
+        author.posts.all(), resolve_scopes(profile_scopes, request, username),
+    )
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    paginator = NumberedPaginator(
+        SearchResults(query), settings.POSTS_PER_PAGE,
+        query_params={'q': query},
+    )
+    page_obj = paginator.get_page(request.GET.get('page'))
+    return render(request, 'posts/search.html', {
+        'query': query,
+        'page_obj': page_obj,
+    })
+
+
 @login_required
 def post_create(request):
     post = Post.objects.select_related('author')
     form = PostForm(request.POST or None)
-    if form.is_valid():
+    image_form = PostImageForm(request.POST or None,
+                               files=request.FILES or None,
+                               instance=form.instance)
+    if form.is_valid() and image_form.is_valid():
         post_item = form.save(commit=False)
         post_item.author = request.user
         post_item.save()
@@ -58,7 +132,7 @@ def post_create(request):
     return render(
         request,
         'posts/create_post.html',
-        {'post': post, 'form': form}
+        {'post': post, 'form': form, 'image_form': image_form}
     )
 
 
@@ -69,13 +143,16 @@ def post_edit(request, post_id):
         messages.error(request, 'Вы не можете редактировать чужие публикации!')
         return redirect('posts:post_details', post_id)
     form = PostForm(request.POST or None, instance=post)
-    if form.is_valid():
+    image_form = PostImageForm(request.POST or None,
+                               files=request.FILES or None, instance=post)
+    if form.is_valid() and image_form.is_valid():
         form.save()
         return redirect('posts:post_details', post_id)
     return render(
         request,
         'posts/create_post.html',
-        {'post': post, 'form': form, 'is_edit': True},
+        {'post': post, 'form': form, 'image_form': image_form,
+         'is_edit': True},
     )
 
 
@@ -87,3 +164,30 @@ def post_delete(request, post_id):
         return redirect('posts:index')
     messages.error(request, 'Вы не можете удалять чужие публикации!')
     return redirect('posts:post_details', post_id)
+
+
+@staff_member_required
+def export_table(request, table):
+    if table not in EXPORTS:
+        raise Http404
+    export_format = request.GET.get('format', 'jsonl')
+    since_id = request.GET.get('since_id')
+    since_date = request.GET.get('since_date')
+    if (export_format not in CONTENT_TYPES
+            or since_id and not since_id.isdigit()):
+        return HttpResponseBadRequest()
+    if since_date:
+        since_date = parse_since_date(since_date)
+        if since_date is None or EXPORTS[table][2] is None:
+            return HttpResponseBadRequest()
+    compress = 'gzip' in request.GET
+    filename = f'{table}.{export_format}' + ('.gz' if compress else '')
+    response = StreamingHttpResponse(
+        export(table, export_format, compress=compress,
+               since_id=int(since_id) if since_id else None,
+               since_date=since_date or None),
+        content_type=(
+            'application/gzip' if compress else CONTENT_TYPES[export_format]),
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -45,20 +45,71 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.StaticFilesMiddleware',
+    'core.middleware.CompressionMiddleware',
+    'core.middleware.SQLInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.ratelimit.RateLimitMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Сжатие ответов core.middleware.CompressionMiddleware.
+COMPRESSION_MIN_SIZE = 1024
+COMPRESSION_LEVEL = 6
+
+# Ограничения частоты для core.ratelimit: маршрут -> методы и ведра вида
+# '<ip|user|route>:<число>/<s|m|h|d>'. Запись в SQLite идёт одним
+# писателем, а вход и регистрация считают PBKDF2, поэтому лимиты стоят
+# на них. RATE_LIMIT_IP_HEADER — заголовок с адресом клиента за прокси.
+RATE_LIMITS = {
+    'posts:post_create': {
+        'methods': ('POST',),
+        'limits': ('ip:120/h', 'user:60/h', 'route:50/s'),
+    },
+    'posts:post_update': {
+        'methods': ('POST',),
+        'limits': ('ip:240/h', 'user:120/h', 'route:50/s'),
+    },
+    'posts:post_delete': {
+        'methods': ('GET', 'POST'),
+        'limits': ('ip:120/h', 'user:60/h', 'route:50/s'),
+    },
+    'users:login': {
+        'methods': ('POST',),
+        'limits': ('ip:10/m', 'route:20/s'),
+    },
+    'users:signup': {
+        'methods': ('POST',),
+        'limits': ('ip:10/h', 'route:5/s'),
+    },
+    'users:password_reset_form': {
+        'methods': ('POST',),
+        'limits': ('ip:5/h', 'route:5/s'),
+    },
+}
+RATE_LIMIT_IP_HEADER = None
+
+# Учёт SQL-запросов: Server-Timing, строка в логе core.middleware и
+# предупреждение, если одна форма запроса повторилась больше
+# SQL_REPEAT_LIMIT раз. SQL_REPEAT_RAISE превращает его в ошибку.
+SQL_INSTRUMENTATION = True
+SQL_REPEAT_LIMIT = 5
+SQL_REPEAT_RAISE = False
+
 ROOT_URLCONF = 'yatube.urls'
 
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
     {
@@ -84,9 +135,70 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        # SQLite с PRAGMA из core.backends.sqlite3.DEFAULT_PRAGMAS (WAL,
+        # synchronous=NORMAL, mmap, кэш страниц, busy_timeout); здесь их
+        # можно переопределить через OPTIONS['pragmas'].
+        'ENGINE': 'core.backends.sqlite3',
         'NAME': str(os.path.join(BASE_DIR, 'db.sqlite3')),
-    }
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+        },
+    },
+    # Копия default для чтения лент; обновляется командой refresh_replica.
+    # Пока файла нет, всё читается с default.
+    'replica': {
+        'ENGINE': 'core.backends.sqlite3',
+        'NAME': str(os.path.join(BASE_DIR, 'db_replica.sqlite3')),
+        # Соединение на запрос: после подмены файла сразу читается новая
+        # копия.
+        'CONN_MAX_AGE': 0,
+        'OPTIONS': {
+            'pragmas': {'journal_mode': None, 'query_only': 1},
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+REPLICA_DATABASE = 'replica'
+REPLICA_VIEWS = (
+    'posts:index',
+    'posts:group',
+    'posts:profile',
+    'posts:post_details',
+)
+# После записи пользователь столько секунд читает только с default.
+REPLICA_PIN_VIEWS = ('posts:post_delete',)
+REPLICA_PIN_SECONDS = 30
+REPLICA_PIN_COOKIE = 'pin_primary'
+
+# Кэш общий для всех процессов сервера и воркеров: в нём лежат версии
+# областей страниц (posts.page_cache), и сброс в одном процессе должен быть
+# виден остальным. Тесты и замеры работают со своим временным кэшем
+# (core.cache), а после выкладки новых шаблонов кэш сбрасывает команда
+# clear_cache.
+# В кэше лежат версии областей, страницы для анонимов с их сжатыми копиями
+# и карточки постов (по одной на пост в каждой из трёх лент). При
+# переполнении FileBasedCache удаляет случайную треть файлов. Это
+# безопасно: всё в кэше пересоздаётся, а вёдра core.ratelimit, которые
+# пересоздавать нельзя, лежат в базе. Проверка переполнения перечисляет
+# весь каталог (около 60 мс на 10000 файлов), поэтому
+# core.cache.FileBasedCache делает её раз в CULL_INTERVAL записей.
+# MAX_ENTRIES — компромисс между этой ценой и тем, как часто страницы
+# приходится перерисовывать. Если кэш понадобится сильно больше, его пора
+# переносить на memcached.
+CACHES = {
+    'default': {
+        'BACKEND': 'core.cache.FileBasedCache',
+        'LOCATION': os.environ.get('DJANGO_CACHE_LOCATION',
+                                   os.path.join(BASE_DIR, 'django_cache')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+            'CULL_INTERVAL': 100,
+        },
+    },
 }
 
 # Password validation
@@ -127,6 +239,14 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static')
 ]
 STATIC_URL = '/static/'
+# collectstatic добавляет хэш содержимого к именам, сжимает файлы в .gz и
+# .br (если установлен brotli), а StaticFilesMiddleware отдаёт их из
+# STATIC_ROOT с Cache-Control: immutable.
+STATIC_ROOT = os.path.join(BASE_DIR, 'static_root')
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+
+MEDIA_URL = '/media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
@@ -139,7 +259,24 @@ LOGIN_REDIRECT_URL = 'posts:index'
 
 # У меня в проекте это всё хранится при помощи python-decouple, который
 # не проходит автотесты
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+# Письма копятся в таблице core.OutgoingEmail, а на сервер их отправляет
+# команда send_queued_mail через MAIL_SPOOL_BACKEND.
+EMAIL_BACKEND = 'core.mail.SpoolBackend'
+MAIL_SPOOL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+MAIL_BATCH_SIZE = 50
+MAIL_MAX_ATTEMPTS = 6
+MAIL_RETRY_DELAY = 60
+MAIL_RETRY_MAX_DELAY = 60 * 60
+MAIL_LEASE = 10 * 60
+
+# Фоновые задачи core.jobs: их выполняет команда run_workers.
+JOBS_CONCURRENCY = 4
+JOBS_LEASE = 5 * 60
+JOBS_POLL_INTERVAL = 1
+JOBS_MAX_ATTEMPTS = 5
+JOBS_RETRY_DELAY = 10
+JOBS_RETRY_MAX_DELAY = 60 * 60
+JOBS_KEEP_DONE = 24 * 60 * 60
 EMAIL_HOST = 'smtp.yandex.ru'
 EMAIL_USE_TSL = False
 EMAIL_USE_SSL = True